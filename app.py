@@ -1,11 +1,15 @@
 import streamlit as st
-from ui import render_ui
+from ui import render_ui, render_metrics, render_budget
 from map_utils import render_map_and_get_state
-from search_utils import run_search
-from sheets_utils import upload_to_google_sheets
-from io import BytesIO
+from results_utils import ResultSet, session_memory_bytes
+from jobs_utils import start_search_job, get_job, cancel_job
+from export_utils import render_export
+from budget_utils import current_user
 import pandas as pd
 
+JOB_POLL_INTERVAL = 1.0  # seconden tussen updates van een lopende zoekopdracht
+SHEET_LINK = "https://docs.google.com/spreadsheets/d/1tZNnGy-KBW0LdnmzqDbKGgkQ1I8wM7_rf5qnbAkTy0s/edit?gid=0#gid=0"
+
 st.title("Webscraper via Google Places API")
 st.write("Hier kun je automatisch gegevens van door jou gekozen bedrijven ophalen!")
 
@@ -15,10 +19,53 @@ if "search_option" not in st.session_state:
 if "radius_m" not in st.session_state:
     st.session_state.radius_m = 1000
 
-search_option, category_input, place_input, radius_m = render_ui()
+search_option, category_input, place_input, radius_m, force_refresh, collect_metrics = render_ui()
+render_budget(current_user())
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def show_search_job(job_id):
+    """Toon voortgang en tussentijdse resultaten van de achtergrondjob; bij afronden de resultaten overnemen"""
+    job = get_job(job_id)
+    if job is None:
+        del st.session_state["job_id"]
+        st.rerun()
+    status, rows, messages, (fraction, text) = job.snapshot()
+
+    if status == "running":
+        if fraction is None:
+            st.info(text or "Zoeken... Even geduld alsjeblieft :)")
+        else:
+            st.progress(fraction, text=text)
+        for level, message in messages:
+            getattr(st, level)(message)
+        if rows:
+            st.subheader(f"Tussentijdse resultaten ({len(rows)})")
+            df_rows = pd.DataFrame(rows)
+            if search_option == "Categorie typen en plaats selecteren op kaart":
+                render_map_and_get_state(radius_m, results=df_rows, force_render=True, key_suffix=f"job_{job_id}")
+            st.dataframe(df_rows)
+        return
+
+    # Job is klaar: resultaten in session_state zetten en de hele pagina opnieuw opbouwen
+    del st.session_state["job_id"]
+    st.session_state.job_messages = messages
+    st.session_state.last_metrics = job.metrics.snapshot() if job.metrics else None
+    st.session_state.sheet_url = job.sheet_url
+    if status == "failed":
+        st.session_state.job_messages.append(("error", f"Zoeken mislukt: {job.error}"))
+    elif status == "done":
+        df_active = job.result[0]
+        if df_active is None or df_active.empty:
+            st.session_state.job_messages.append(("warning", "Geen resultaten gevonden."))
+        else:
+            # Flag dat er gezocht is
+            st.session_state.has_searched = True
+            # Eén compacte, getypte DataFrame met vooraf berekende vingerafdruk (zie results_utils)
+            st.session_state.results = ResultSet(df_active)
+    st.rerun()
 
 # Default kaart als er nog geen resultaten zijn
-if search_option == "Categorie typen en plaats selecteren op kaart" and not st.session_state.get("last_results"):
+if search_option == "Categorie typen en plaats selecteren op kaart" and not st.session_state.get("results") and not st.session_state.get("job_id"):
     clicked_location = render_map_and_get_state(radius_m, force_render=True, key_suffix="default")
 
 zoek, annuleren = st.columns([1,1])
@@ -28,88 +75,92 @@ with annuleren:
     annuleren_knop = st.button("Annuleren", key="btn_annuleren")
 
 if zoek_knop:
-    # Reset tijdelijke markers en session_state
-    st.session_state.last_results = []
+    # Lopende zoekopdracht stoppen en tijdelijke markers en session_state resetten
+    if st.session_state.get("job_id"):
+        cancel_job(st.session_state.job_id)
+    st.session_state.results = None
+    st.session_state.job_messages = []
+    st.session_state.last_metrics = None
 
     clicked_location = st.session_state.get("clicked_location") if search_option == "Categorie typen en plaats selecteren op kaart" else None
 
-    df, input_text, filename = run_search(
-        search_option=search_option,
-        category_input=category_input,
-        place_input=place_input,
-        clicked_location=clicked_location,
-        radius_m=radius_m
-    )
-
-    if df is None or df.empty:
-        st.warning("Geen resultaten gevonden.")
+    if search_option == "Categorie typen en plaats selecteren op kaart" and not clicked_location:
+        st.warning("Klik eerst op de kaart om een locatie te selecteren!")
     else:
-        # Flag dat er gezocht is
-        st.session_state.has_searched = True
+        st.session_state.job_id = start_search_job(
+            dict(
+                search_option=search_option,
+                category_input=category_input,
+                place_input=place_input,
+                clicked_location=clicked_location,
+                radius_m=radius_m,
+                force_refresh=force_refresh,
+                user=current_user()
+            ),
+            category_input,
+            collect_metrics=collect_metrics
+        )
+
+if st.session_state.get("job_id"):
+    show_search_job(st.session_state.job_id)
 
-        df_active = upload_to_google_sheets(df, category_input, input_text)
-        st.session_state.last_results = df_active.to_dict(orient="records")
+for level, message in st.session_state.get("job_messages", []):
+    getattr(st, level)(message)
+if st.session_state.get("last_metrics"):
+    render_metrics(st.session_state.last_metrics)
 
 # DF (en map) tonen
-if st.session_state.get("last_results"):
-    df_active = pd.DataFrame(st.session_state.last_results)
+if st.session_state.get("results"):
+    # Kaart, tabel en export lezen allemaal dezelfde DataFrame; er wordt niets gekopieerd of opnieuw opgebouwd
+    result_set = st.session_state.results
+    # Link naar de worksheet van deze zoekopdracht (zie sheets_utils.sheet_url), anders naar de eerste worksheet
+    sheet_link = st.session_state.get("sheet_url") or SHEET_LINK
+    df_active, fingerprint = result_set.df, result_set.fingerprint
 
     if search_option == "Categorie typen en plaats selecteren op kaart":
         map_col, df_col = st.columns([3, 2])
 
         with map_col:
             st.subheader("Resultaten op kaart")
-            render_map_and_get_state(radius_m, results=st.session_state.last_results, force_render=True, key_suffix=f"search_{hash(str(st.session_state.last_results))}")
+            render_map_and_get_state(
+                radius_m, results=df_active, force_render=True,
+                key_suffix=f"search_{fingerprint}", fingerprint=fingerprint
+            )
 
         with df_col:
             st.subheader("Resultaten tabel")
             st.dataframe(df_active)
-
-            excel_buffer = BytesIO()
-            df_active.to_excel(excel_buffer, index=False)
-            excel_buffer.seek(0)
-            st.download_button(
-                label="Download Excel-bestand",
-                data=excel_buffer.getvalue(),
-                file_name="resultaten.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="download_excel_rerun"
-            )
+            st.caption(f"{len(result_set)} resultaten, {session_memory_bytes(st.session_state) / 1024:.0f} KB geheugen in deze sessie")
+            render_export(df_active, fingerprint)
 
             # Link naar Google Sheet
             st.markdown(
-                "[Klik hier om gegevens van eerdere bedrijven in Google Sheets te bekijken](https://docs.google.com/spreadsheets/d/1tZNnGy-KBW0LdnmzqDbKGgkQ1I8wM7_rf5qnbAkTy0s/edit?gid=0#gid=0)",
+                f"[Klik hier om gegevens van eerdere bedrijven in Google Sheets te bekijken]({sheet_link})",
                 unsafe_allow_html=True
             )
     else:
         st.subheader("Resultaten tabel")
         st.dataframe(df_active)
-
-        excel_buffer = BytesIO()
-        df_active.to_excel(excel_buffer, index=False)
-        excel_buffer.seek(0)
-        st.download_button(
-            label="Download Excel-bestand",
-            data=excel_buffer.getvalue(),
-            file_name="resultaten.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="download_excel_rerun"
-        )
+        st.caption(f"{len(result_set)} resultaten, {session_memory_bytes(st.session_state) / 1024:.0f} KB geheugen in deze sessie")
+        render_export(df_active, fingerprint)
 
         # Link naar Google Sheet
         st.markdown(
-            "[Klik hier om gegevens van eerdere bedrijven in Google Sheets te bekijken](https://docs.google.com/spreadsheets/d/1tZNnGy-KBW0LdnmzqDbKGgkQ1I8wM7_rf5qnbAkTy0s/edit?gid=0#gid=0)",
+            f"[Klik hier om gegevens van eerdere bedrijven in Google Sheets te bekijken]({sheet_link})",
             unsafe_allow_html=True
         )
 
 if st.session_state.get("has_searched"):
     if st.button("Nieuwe zoekopdracht", key="btn_reset"):
-        for k in ["clicked_location", "last_results", "scrape_results", "map_center", "map_zoom", "map_bounds", "has_searched", "radius_m"]:
+        for k in ["clicked_location", "results", "marker_layers", "scrape_results", "map_center", "map_zoom", "map_bounds", "has_searched", "radius_m", "job_messages", "last_metrics", "sheet_url"]:
             if k in st.session_state:
                 del st.session_state[k]
         st.rerun()
 
 if annuleren_knop:
+    # Lopende zoekopdracht echt stoppen (ook de openstaande API-calls en website-crawls)
+    if st.session_state.get("job_id"):
+        cancel_job(st.session_state.job_id)
     for k in list(st.session_state.keys()):
         del st.session_state[k]
     st.rerun()
\ No newline at end of file
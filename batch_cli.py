@@ -0,0 +1,248 @@
+"""
+Zoekopdrachten in bulk draaien zonder Streamlit, bijvoorbeeld 's nachts.
+
+    python batch_cli.py opdracht.json --output resultaten.xlsx --workers 4 --max-calls 5000
+
+Het opdrachtbestand is JSON met alle combinaties van categorieën en plaatsen:
+
+    {"categories": ["Restaurant", "Kapper"], "places": ["Nijmegen", "Oosterhout"]}
+
+Elke afgeronde combinatie wordt direct in de checkpointmap bewaard. Een afgebroken run
+(Ctrl+C, --max-calls bereikt of Places-budget op, zie budget_utils) gaat met hetzelfde commando verder waar hij gebleven was.
+Als alle combinaties klaar zijn, worden ze in één keer naar Google Sheets gesynchroniseerd.
+De historie van de oude sheet1 wordt bij de eerste sync vanzelf over de worksheets per categorie verdeeld;
+`python batch_cli.py --migrate-sheet` doet dat (nog eens) los, rijen die er al staan worden overgeslagen.
+API-sleutels komen uit GOOGLE_PLACES_API_KEY en GOOGLE_SERVICE_ACCOUNT (zie config_utils).
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from notify_utils import redirect_notifications
+from metrics_utils import Metrics, collecting, to_json, to_prometheus
+from search_utils import run_search_cached, search_cache_key, places_limiter, PLACES_QPS
+from budget_utils import BudgetExceeded
+from sheets_utils import upload_batch_to_google_sheets, migrate_legacy_sheet
+from export_utils import to_excel_bytes, to_csv_bytes, to_parquet_bytes
+
+SEARCH_OPTION = "Categorie en plaats typen"
+BATCH_WORKERS = 4  # gelijktijdige zoekopdrachten; de Places-calls delen samen places_limiter
+BATCH_USER = "batch"  # gebruiker voor het Places-budget (zie budget_utils)
+MANIFEST = "manifest.jsonl"
+SYNCED = "synced"
+
+logger = logging.getLogger("webscraper.batch")
+
+WRITERS = {".xlsx": to_excel_bytes, ".csv": to_csv_bytes, ".parquet": to_parquet_bytes}
+
+def load_combinations(path):
+    """Lees het opdrachtbestand; returnt de lijst (categorie, plaats) zonder dubbelingen, in volgorde"""
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    combinations = [(category, place) for category in spec["categories"] for place in spec["places"]]
+    return list(dict.fromkeys(combinations))
+
+class Checkpoint:
+    """
+    Voortgang van een batch op schijf: per afgeronde combinatie een regel in manifest.jsonl
+    en (als er resultaten waren) een pickle met de rijen. Bestanden worden atomair geschreven.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.entries = {}
+        path = os.path.join(directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def part_path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest()[:16] + ".pkl")
+
+    def is_done(self, key):
+        return key in self.entries
+
+    def record(self, key, category, place, df, input_text, api_calls):
+        entry = {"key": key, "category": category, "place": place, "input": input_text,
+                 "rows": 0 if df is None else len(df), "api_calls": api_calls}
+        if entry["rows"]:
+            tmp = self.part_path(key) + ".tmp"
+            df.to_pickle(tmp)
+            os.replace(tmp, self.part_path(key))
+        with self.lock:
+            with open(os.path.join(self.directory, MANIFEST), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries[key] = entry
+
+    def results(self):
+        """Returnt (df, categorie, input_text) van alle afgeronde combinaties met resultaten"""
+        return [
+            (pd.read_pickle(self.part_path(entry["key"])), entry["category"], entry["input"])
+            for entry in self.entries.values() if entry["rows"]
+        ]
+
+    @property
+    def synced(self):
+        return os.path.exists(os.path.join(self.directory, SYNCED))
+
+    def mark_synced(self):
+        open(os.path.join(self.directory, SYNCED), "w").close()
+
+def run_combination(category, place, force_refresh, cancel_event, metrics=None):
+    """Eén zoekopdracht; meldingen gaan met de combinatie als prefix naar de logging"""
+    prefix = f"[{category} in {place}]"
+
+    def sink(level, message):
+        if level != "progress":
+            logger.info("%s %s", prefix, message)
+
+    stats = Counter()
+    with redirect_notifications(sink), (collecting(metrics) if metrics else nullcontext()):
+        df, input_text, _ = run_search_cached(
+            SEARCH_OPTION, category, place, None, None,
+            force_refresh=force_refresh, cancel_event=cancel_event, stats=stats, user=BATCH_USER
+        )
+    return df, input_text, stats["places_calls"] + stats["details_calls"]
+
+def run_batch(combinations, checkpoint, workers=BATCH_WORKERS, max_calls=None, force_refresh=False, metrics=None):
+    """
+    Draai alle nog niet afgeronde combinaties parallel.
+    Zodra max_calls API-calls gebruikt zijn of het Places-budget op is worden geen nieuwe combinaties meer gestart.
+    Returnt True als alle combinaties klaar zijn (mislukte combinaties worden bij een volgende run opnieuw geprobeerd).
+    """
+    pending = [(category, place) for category, place in combinations
+               if not checkpoint.is_done(search_cache_key(SEARCH_OPTION, category, place, None, None))]
+    logger.info("%d van %d combinaties nog te doen", len(pending), len(combinations))
+    cancel_event = threading.Event()
+    used_calls = 0
+    failed = 0
+    out_of_budget = False
+    running = {}
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+    try:
+        while pending or running:
+            while pending and len(running) < workers and not out_of_budget and (max_calls is None or used_calls < max_calls):
+                category, place = pending.pop(0)
+                future = executor.submit(run_combination, category, place, force_refresh, cancel_event, metrics)
+                running[future] = (category, place)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                category, place = running.pop(future)
+                try:
+                    df, input_text, api_calls = future.result()
+                except BudgetExceeded as e:
+                    logger.warning("[%s in %s] niet gezocht: %s", category, place, e)
+                    out_of_budget = True
+                    pending.insert(0, (category, place))
+                    continue
+                except Exception as e:
+                    logger.error("[%s in %s] mislukt: %s", category, place, e)
+                    failed += 1
+                    continue
+                used_calls += api_calls
+                if cancel_event.is_set():
+                    continue  # geannuleerd: bij de volgende run opnieuw
+                checkpoint.record(search_cache_key(SEARCH_OPTION, category, place, None, None),
+                                  category, place, df, input_text, api_calls)
+                logger.info("[%s in %s] %d resultaten, %d API-calls (totaal %d)",
+                            category, place, 0 if df is None else len(df), api_calls, used_calls)
+    except KeyboardInterrupt:
+        logger.warning("Afgebroken; lopende zoekopdrachten worden gestopt. Start opnieuw om verder te gaan.")
+        cancel_event.set()
+        return False
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    if pending and out_of_budget:
+        logger.warning("Places-budget op: %d combinaties niet gedaan. Start later opnieuw om verder te gaan.", len(pending))
+    elif pending:
+        logger.warning("API-budget van %d calls op: %d combinaties niet gestart. Start opnieuw om verder te gaan.",
+                       max_calls, len(pending))
+    if failed:
+        logger.warning("%d combinaties mislukt. Start opnieuw om ze nog eens te proberen.", failed)
+    return not pending and not failed
+
+def write_output(searches, path):
+    """Alle resultaten in één bestand; het formaat volgt uit de extensie (.xlsx, .csv of .parquet)"""
+    extension = os.path.splitext(path)[1].lower()
+    df = pd.concat([df for df, _, _ in searches], ignore_index=True) if searches else pd.DataFrame()
+    with open(path, "wb") as f:
+        f.write(WRITERS[extension](df))
+    logger.info("%d rijen geschreven naar %s", len(df), path)
+
+def write_metrics(metrics, path):
+    if metrics is None:
+        return
+    snapshot = metrics.snapshot()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(to_prometheus(snapshot) if path.endswith(".prom") else to_json(snapshot))
+    logger.info("Metingen geschreven naar %s (ca. $%.2f API-kosten)", path, snapshot["total"]["cost_usd"])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Zoekopdrachten (categorie × plaats) in bulk draaien zonder Streamlit")
+    parser.add_argument("jobfile", nargs="?", help="JSON met 'categories' en 'places'")
+    parser.add_argument("--output", default="resultaten.xlsx", help="uitvoerbestand (.xlsx, .csv of .parquet)")
+    parser.add_argument("--checkpoint-dir", help="map voor de voortgang (standaard <jobfile>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="gelijktijdige zoekopdrachten")
+    parser.add_argument("--qps", type=float, default=PLACES_QPS, help="maximaal aantal Places API-calls per seconde, voor alle zoekopdrachten samen")
+    parser.add_argument("--max-calls", type=int, help="maximaal aantal API-calls voor deze run")
+    parser.add_argument("--force-refresh", action="store_true", help="resultaten uit de cache negeren")
+    parser.add_argument("--no-sheets", action="store_true", help="niet naar Google Sheets synchroniseren")
+    parser.add_argument("--metrics", help="metingen per stap wegschrijven (.json of .prom voor Prometheus)")
+    parser.add_argument("--migrate-sheet", action="store_true", help="alleen de historie van de oude sheet1 over de worksheets per categorie verdelen")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not args.migrate_sheet and not args.jobfile:
+        parser.error("een opdrachtbestand is verplicht (behalve met --migrate-sheet)")
+
+    if os.path.splitext(args.output)[1].lower() not in WRITERS:
+        parser.error(f"onbekend uitvoerformaat: {args.output}")
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.migrate_sheet:
+        logger.info("%d rijen uit sheet1 naar de worksheets per categorie overgezet", migrate_legacy_sheet())
+        return 0
+
+    places_limiter.set_rate(args.qps)
+    combinations = load_combinations(args.jobfile)
+    checkpoint = Checkpoint(args.checkpoint_dir or f"{args.jobfile}.checkpoint")
+
+    metrics = Metrics() if args.metrics else None
+    complete = run_batch(combinations, checkpoint, args.workers, args.max_calls, args.force_refresh, metrics)
+    searches = checkpoint.results()
+    write_output(searches, args.output)
+
+    if not complete:
+        write_metrics(metrics, args.metrics)
+        return 1
+    status = 0
+    if not args.no_sheets and searches and not checkpoint.synced:
+        try:
+            with collecting(metrics) if metrics else nullcontext():
+                upload_batch_to_google_sheets(searches, raise_errors=True)
+            checkpoint.mark_synced()
+            logger.info("%d zoekopdrachten in één keer naar Google Sheets gesynchroniseerd", len(searches))
+        except Exception as e:
+            logger.error("Synchroniseren met Google Sheets mislukt: %s. Start opnieuw om het nog eens te proberen.", e)
+            status = 1
+    write_metrics(metrics, args.metrics)
+    return status
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,39 @@
+"""
+Micro-benchmark: doorvoer van get_place_details_batch als functie van de pool size,
+tegen een lokale Places-stub met vaste latency per request (zonder cache en zonder rate limit).
+
+Draaien vanuit de projectmap:
+    python -m benchmarks.bench_details_pool
+"""
+import time
+import search_utils
+from http_utils import TokenBucket
+from benchmarks.places_stub import PlacesStub, generate_places
+
+N_DETAILS = 200
+LATENCY = 0.05  # seconden per request
+POOL_SIZES = [1, 2, 4, 8, 16, 32]
+
+def main():
+    stub = PlacesStub(generate_places(51.8425, 5.8528, 2000, N_DETAILS), latency=LATENCY).start()
+    search_utils.set_api_key("stub")
+    search_utils.DETAILS_URL = f"{stub.base_url}/details/json"
+    search_utils.places_limiter = TokenBucket(0)
+    search_utils.details_cache.get = lambda place_id, fields: None
+    search_utils.details_cache.set = lambda place_id, fields, result, ttl=None: None
+    place_ids = [f"stub_{i}" for i in range(N_DETAILS)]
+
+    try:
+        print(f"{N_DETAILS} Place Details, {LATENCY * 1000:.0f} ms latency per request")
+        print(f"{'pool':>5} | {'seconden':>8} | {'details/s':>9}")
+        for pool_size in POOL_SIZES:
+            start = time.perf_counter()
+            results, errors = search_utils.get_place_details_batch(place_ids, max_workers=pool_size)
+            elapsed = time.perf_counter() - start
+            assert not errors and [r["name"] for r in results] == [f"Bedrijf {i}" for i in range(N_DETAILS)]
+            print(f"{pool_size:>5} | {elapsed:>8.2f} | {N_DETAILS / elapsed:>9.1f}")
+    finally:
+        stub.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: aantal API-calls en unieke place_ids van het oude vierkante grid (generate_grid)
+versus de adaptieve hex-planner (plan_hex_grid + hex_subdivider) per maximale opsplitsdiepte,
+tegen een lokale Places-stub. De stub plaatst N_PLACES plaatsen in elke cirkel, dus kleine radii zijn extreem dicht.
+
+Draaien vanuit de projectmap:
+    python -m benchmarks.bench_grid_planner
+"""
+import search_utils
+from benchmarks.places_stub import PlacesStub, generate_places, distance_m
+
+CENTER = (51.8425, 5.8528)  # Nijmegen
+RADII = [500, 1000, 2500, 5000]
+N_PLACES = 3000
+DEPTHS = [0, 1, 2, 9]  # 9: in de praktijk onbeperkt, alleen MIN_CELL_RADIUS_M begrenst
+
+def run(stub, cells, subdivide=None):
+    stub.calls.clear()
+    results, stats = search_utils.run_grid_search("restaurant", cells, qps=0, subdivide=subdivide)
+    return results, sum(stub.calls.values()), stats["points"]
+
+def in_circle(results, radius_m):
+    return {
+        r["place_id"] for r in results
+        if distance_m(*CENTER, r["geometry"]["location"]["lat"], r["geometry"]["location"]["lng"]) <= radius_m
+    }
+
+def main():
+    search_utils.set_api_key("stub")
+    search_utils.PAGE_TOKEN_MIN_WAIT = 0
+    print(f"{'radius':>7} {'depth':>5} | {'grid calls':>10} {'grid ids':>9} | {'hex calls':>9} {'hex ids':>8} | {'calls x':>7}")
+    for radius_m in RADII:
+        stub = PlacesStub(generate_places(*CENTER, radius_m, N_PLACES)).start()
+        search_utils.TEXT_SEARCH_URL = f"{stub.base_url}/textsearch/json"
+        search_utils.NEARBY_SEARCH_URL = f"{stub.base_url}/nearbysearch/json"
+        try:
+            step_m = min(radius_m // 3, 1000)
+            grid_cells = [(lat, lon, radius_m) for lat, lon in search_utils.generate_grid(*CENTER, radius_m, step_m=step_m)]
+            grid_results, grid_calls, _ = run(stub, grid_cells)
+            grid_ids = in_circle(grid_results, radius_m)
+
+            for depth in DEPTHS:
+                hex_cells = search_utils.plan_hex_grid(*CENTER, radius_m, min(radius_m, search_utils.MAX_CELL_RADIUS_M))
+                subdivide = search_utils.hex_subdivider(*CENTER, radius_m, max_depth=depth)
+                hex_results, hex_calls, _ = run(stub, hex_cells, subdivide)
+                hex_ids = in_circle(hex_results, radius_m)
+                print(
+                    f"{radius_m:>7} {depth:>5} | {grid_calls:>10} {len(grid_ids):>9} | {hex_calls:>9} {len(hex_ids):>8} | "
+                    f"{grid_calls / max(hex_calls, 1):>7.1f}"
+                )
+        finally:
+            stub.stop()
+
+if __name__ == "__main__":
+    main()
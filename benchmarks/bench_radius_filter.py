@@ -0,0 +1,60 @@
+"""
+Benchmark: filter_within_radius (NumPy haversine) tegen de oude geodesic-loop voor 10k punten,
+inclusief de nauwkeurigheid ten opzichte van geodesic (WGS84).
+
+Draaien vanuit de projectmap:
+    python -m benchmarks.bench_radius_filter
+"""
+import time
+import numpy as np
+from geopy.distance import geodesic
+from search_utils import distances_m, filter_within_radius
+
+CENTER = (51.8425, 5.8528)  # Nijmegen
+RADIUS_M = 5000
+N_POINTS = 10_000
+TOLERANCE = 0.005  # maximale relatieve afwijking t.o.v. geodesic
+
+def make_results(n, seed=7):
+    rng = np.random.default_rng(seed)
+    r = 1.5 * RADIUS_M * np.sqrt(rng.random(n))
+    theta = rng.random(n) * 2 * np.pi
+    lats = CENTER[0] + r * np.sin(theta) / 111_000
+    lons = CENTER[1] + r * np.cos(theta) / (111_000 * np.cos(np.radians(CENTER[0])))
+    return [
+        {"place_id": f"p{i}", "geometry": {"location": {"lat": float(lat), "lng": float(lon)}}}
+        for i, (lat, lon) in enumerate(zip(lats, lons))
+    ]
+
+def main():
+    results = make_results(N_POINTS)
+
+    start = time.perf_counter()
+    legacy = [
+        result for result in results
+        if (loc := result.get("geometry", {}).get("location", {}))
+        and geodesic(CENTER, (loc["lat"], loc["lng"])).meters <= RADIUS_M
+    ]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    kept, _ = filter_within_radius(results, CENTER, RADIUS_M)
+    numpy_s = time.perf_counter() - start
+
+    lats = [r["geometry"]["location"]["lat"] for r in results]
+    lons = [r["geometry"]["location"]["lng"] for r in results]
+    exact = np.array([geodesic(CENTER, (lat, lon)).meters for lat, lon in zip(lats, lons)])
+    approx = distances_m(CENTER, lats, lons)
+    rel_error = np.abs(approx - exact) / np.maximum(exact, 1)
+    mismatches = {r["place_id"] for r in legacy} ^ {r["place_id"] for r in kept}
+
+    print(f"{N_POINTS} punten, radius {RADIUS_M} m")
+    print(f"geodesic-loop:        {legacy_s * 1000:8.1f} ms ({len(legacy)} binnen de radius)")
+    print(f"filter_within_radius: {numpy_s * 1000:8.1f} ms ({len(kept)} binnen de radius)")
+    print(f"speedup:              {legacy_s / numpy_s:8.1f}x")
+    print(f"max afwijking:        {np.max(np.abs(approx - exact)):8.2f} m ({np.max(rel_error):.3%}), "
+          f"{len(mismatches)} punten op de rand anders ingedeeld")
+    assert np.max(rel_error) < TOLERANCE, "haversine wijkt meer af dan de tolerantie"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: diff_results (hash- en inverted indexes) tegen de oude geneste iterrows-vergelijking.
+De nieuwe engine draait op een sheet van 50k rijen tegen 1k resultaten; de oude variant alleen op
+een kleine set (hij is kwadratisch) om de uitkomsten te vergelijken.
+
+Draaien vanuit de projectmap:
+    python -m benchmarks.bench_sheet_diff
+"""
+import random
+import time
+import pandas as pd
+from sheets_utils import COMPARE_COLS, diff_results
+
+SIZES = [(2_000, 200), (10_000, 500), (50_000, 1_000)]
+LEGACY_MAX_ROWS = 2_000
+
+def make_data(n_existing, n_new, seed=1):
+    """Bestaande sheet + nieuwe resultaten: 40% ongewijzigd, 30% gewijzigd (telefoon/e-mail), 30% nieuw"""
+    rng = random.Random(seed)
+    existing = pd.DataFrame({
+        "Naam": [f"Bedrijf {i}" for i in range(n_existing)],
+        "Adres": [f"Straat {i}, Nijmegen" for i in range(n_existing)],
+        "Telefoon": [f"024 {i:07d}" for i in range(n_existing)],
+        "Website": [f"https://bedrijf{i}.nl/" for i in range(n_existing)],
+        "E-mail": [f"info@bedrijf{i}.nl" for i in range(n_existing)],
+    })
+    picks = rng.sample(range(n_existing), int(n_new * 0.7))
+    new = existing.iloc[picks].reset_index(drop=True)
+    changed = new.index[int(n_new * 0.4):]
+    new.loc[changed, "Telefoon"] = [f"06 {rng.randrange(10**8):08d}" for _ in changed]
+    new.loc[changed, "E-mail"] = [f"contact@nieuw{i}.nl" for i in changed]
+    fresh = pd.DataFrame({
+        col: [f"{col} nieuw {i}" for i in range(n_new - len(new))] for col in COMPARE_COLS
+    })
+    return existing, pd.concat([new, fresh], ignore_index=True)
+
+def legacy_diff(df_existing_search, df_new):
+    """De oude vergelijking uit upload_to_google_sheets, teruggebracht tot de classificatie"""
+    existing_tuples = df_existing_search[COMPARE_COLS].apply(tuple, axis=1).tolist()
+    unchanged, changed = set(), set()
+    exact_count = changed_count = 0
+    for _, new_row in df_new.iterrows():
+        new_tuple = tuple(new_row[col] for col in COMPARE_COLS)
+        if new_tuple in existing_tuples:
+            exact_count += 1
+            unchanged.add(df_existing_search.index[existing_tuples.index(new_tuple)])
+            continue
+        for j, old_row in df_existing_search.iterrows():
+            matches = sum(
+                1 for col in COMPARE_COLS
+                if new_row[col] != "" and str(new_row[col]).strip().lower() == str(old_row[col]).strip().lower()
+            )
+            if matches >= 2:
+                changed_count += 1
+                changed.add(j)
+                break
+    return unchanged, changed, exact_count, changed_count
+
+def main():
+    print(f"{'sheet':>7} {'nieuw':>6} | {'diff_results':>12} | {'oud':>8}")
+    for n_existing, n_new in SIZES:
+        existing, new = make_data(n_existing, n_new)
+
+        start = time.perf_counter()
+        diff = diff_results(existing, new, mark_removed=True)
+        elapsed = time.perf_counter() - start
+
+        legacy = "-"
+        if n_existing <= LEGACY_MAX_ROWS:
+            start = time.perf_counter()
+            unchanged, changed, exact_count, changed_count = legacy_diff(existing, new)
+            legacy = f"{time.perf_counter() - start:.2f} s"
+            assert set(diff["unchanged"]) == unchanged and set(diff["changed"]) == changed
+            assert diff["exact_rows"].sum() == exact_count and diff["changed_rows"].sum() == changed_count
+
+        print(f"{n_existing:>7} {n_new:>6} | {elapsed:>10.3f} s | {legacy:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark: API-calls en verstuurde bytes van upload_to_google_sheets in "full"- en "delta"-modus,
+tegen een fake worksheet met een groeiende historie.
+
+Draaien vanuit de projectmap:
+    python -m benchmarks.bench_sheet_sync
+"""
+import pandas as pd
+import sheets_utils
+from benchmarks.fake_gspread import FakeWorksheet
+
+HISTORY_SIZES = [1_000, 10_000, 50_000]
+N_RESULTS = 200
+COLUMNS = ["Input", "Naam", "Adres", "Latitude", "Longitude", "Telefoon", "Website", "E-mail", "Status", "Datum"]
+
+def history(n):
+    rows = [
+        [f"Getypt: Categorie {i % 50} in Nijmegen", f"Bedrijf {i}", f"Straat {i}", "", "",
+         f"024 {i:07d}", f"https://bedrijf{i}.nl/", f"info@bedrijf{i}.nl", "Nieuw", "01-01-2025 12:00:00"]
+        for i in range(n)
+    ]
+    return [COLUMNS] + rows
+
+def results():
+    """Zoekresultaten voor "Restaurant in Nijmegen": de helft bestond al, de helft is nieuw"""
+    return pd.DataFrame([
+        {"Input": "Getypt: Restaurant in Nijmegen", "Naam": f"Restaurant {i}", "Adres": f"Markt {i}",
+         "Telefoon": f"024 {i:07d}", "Website": f"https://restaurant{i}.nl/", "E-mail": f"info@restaurant{i}.nl",
+         "Status": "Nieuw", "Datum": "02-01-2025 12:00:00"}
+        for i in range(N_RESULTS)
+    ])
+
+def main():
+    print(f"{'historie':>8} | {'modus':>5} | {'calls':>30} | {'bytes verstuurd':>15}")
+    for n in HISTORY_SIZES:
+        for mode in ["full", "delta"]:
+            worksheet = FakeWorksheet(history(n))
+            first = results().iloc[:N_RESULTS // 2]
+            sheets_utils.upload_to_google_sheets(first, "Restaurant", "Getypt: Restaurant in Nijmegen", worksheet=worksheet, mode=mode)
+
+            worksheet.calls.clear()
+            worksheet.bytes_sent = 0
+            sheets_utils.upload_to_google_sheets(results(), "Restaurant", "Getypt: Restaurant in Nijmegen", worksheet=worksheet, mode=mode)
+            calls = ", ".join(f"{k}={v}" for k, v in sorted(worksheet.calls.items()))
+            print(f"{n:>8} | {mode:>5} | {calls:>30} | {worksheet.bytes_sent:>15,}")
+
+if __name__ == "__main__":
+    main()
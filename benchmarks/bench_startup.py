@@ -0,0 +1,67 @@
+"""
+Benchmark: cold start van de app-modules, elke meting in een vers Python-proces.
+Laat zien hoe lang importeren duurt (voor de app en voor de CLI/workers, inclusief streamlit),
+welke zware libraries daarbij al geladen worden en wat het laden van die libraries zou kosten
+als dat (zoals vroeger) bij het importeren gebeurde.
+Er zijn geen secrets nodig: credentials en clients worden pas bij het eerste gebruik aangemaakt.
+
+Draaien vanuit de projectmap:
+    python -m benchmarks.bench_startup
+"""
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+APP_MODULES = ["ui", "map_utils", "jobs_utils", "export_utils", "search_utils", "sheets_utils", "email_utils"]
+CLI_MODULES = ["batch_cli", "jobs_utils"]  # zonder UI: hoort streamlit niet te laden
+HEAVY_MODULES = ["streamlit", "gspread", "google.oauth2.service_account", "folium", "streamlit_folium", "geopy", "xlsxwriter", "aiohttp"]
+
+# Wordt in het subproces uitgevoerd; print de importtijd en de zware modules die al geladen zijn
+SCRIPT = """
+import importlib, sys, time
+import pandas, numpy  # basis die ook de CLI altijd nodig heeft; niet meetellen (streamlit wel)
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+def measure(modules):
+    """Mediaan van de importtijd over RUNS verse processen; returnt (seconden, geladen zware modules)"""
+    timings = []
+    loaded = ""
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", SCRIPT.format(modules=modules, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        timings.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else ""
+    return statistics.median(timings), loaded
+
+def main():
+    app_time, loaded = measure(APP_MODULES)
+    print(f"App-modules importeren: {app_time * 1000:.0f} ms (mediaan van {RUNS} koude starts)")
+    print(f"Zware libraries geladen bij importeren: {loaded or 'geen'}")
+    cli_time, loaded = measure(CLI_MODULES)
+    print(f"CLI/worker-modules importeren: {cli_time * 1000:.0f} ms")
+    print(f"Zware libraries geladen bij importeren: {loaded or 'geen'}")
+    print()
+    print(f"{'los importeren':>30} | {'ms':>6}")
+    total = 0.0
+    for name in HEAVY_MODULES:
+        try:
+            heavy_time, _ = measure([name])
+        except subprocess.CalledProcessError:
+            print(f"{name:>30} | {'n.v.t.':>6}")
+            continue
+        total += heavy_time
+        print(f"{name:>30} | {heavy_time * 1000:>6.0f}")
+    print(f"{'totaal (los gemeten)':>30} | {total * 1000:>6.0f}")
+    print("Daarbovenop kostte gspread.authorize bij elke koude start een credentials-setup, nu pas bij de eerste upload.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Offline benchmark van de hele pijplijn, zonder echte API-quota of echte websites:
+  - "search": run_search (kaartzoekopdracht) tegen de Places-stub, met de website-farm als websites
+  - "emails": crawl_emails tegen alleen de website-farm
+  - "sheets": upload_to_google_sheets (delta) tegen een fake worksheet met historie
+per datasetgrootte, met doorvoer, latency-percentielen en aantallen calls.
+De resultaten worden als JSON in benchmarks/results/ bewaard en vergeleken met de vorige run.
+
+Draaien vanuit de projectmap:
+    python -m benchmarks.bench_suite --sizes 50 200 --repeats 3
+    python -m benchmarks.bench_suite --compare benchmarks/results/<eerdere run>.json
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+import search_utils
+import sheets_utils
+import email_utils
+from email_utils import crawl_emails
+from benchmarks.places_stub import PlacesStub, generate_places
+from benchmarks.site_farm import SiteFarm
+from benchmarks.fake_gspread import FakeWorksheet
+
+CENTER = (51.8425, 5.8528)
+RADIUS_M = 2000
+SIZES = [50, 200, 800]
+REPEATS = 3
+LATENCY = 0.02  # seconden per Places-call
+TOKEN_DELAY = 0.5  # seconden voordat een page token geldig is
+OVER_QUERY_LIMIT = 0.02  # deel van de Places-calls dat OVER_QUERY_LIMIT krijgt
+EMAIL_TIMEOUT = 1.0  # timeout per pagina in het "emails"-scenario; slow sites (2 s) lopen hier tegenaan
+HISTORY_FACTOR = 20  # historie in de fake sheet: zoveel keer de datasetgrootte
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p90": None, "p99": None}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99)}
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "onbekend"
+
+def use_stub(stub, qps):
+    """search_utils naar de stub laten wijzen; caches uit zodat elke herhaling echt het werk doet"""
+    search_utils.set_api_key("stub")
+    search_utils.TEXT_SEARCH_URL = f"{stub.base_url}/textsearch/json"
+    search_utils.NEARBY_SEARCH_URL = f"{stub.base_url}/nearbysearch/json"
+    search_utils.DETAILS_URL = f"{stub.base_url}/details/json"
+    search_utils.places_limiter.set_rate(qps)  # in place: fetch_places_page heeft de limiter als standaardargument
+    search_utils.details_cache.get = lambda place_id, fields: None
+    search_utils.details_cache.set = lambda place_id, fields, result, ttl=None: None
+    email_utils.email_cache.get_many = lambda domains: {}
+    email_utils.email_cache.set_many = lambda entries: None
+
+def bench_search(size, args):
+    places = generate_places(*CENTER, RADIUS_M, size)
+    farm = SiteFarm(size).start()
+    for i, place in enumerate(places):
+        place["website"] = farm.url(i)
+    stub = PlacesStub(places, latency=args.latency, token_delay=TOKEN_DELAY, over_query_limit=args.over_query_limit).start()
+    use_stub(stub, args.qps)
+    timings, rows, stats = [], 0, Counter()
+    try:
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            df, _, _ = search_utils.run_search("Categorie typen en plaats selecteren op kaart", "Bedrijf", None, CENTER, RADIUS_M, stats=stats)
+            timings.append(time.perf_counter() - start)
+            rows = 0 if df is None else len(df)
+    finally:
+        stub.stop()
+        farm.stop()
+    return {
+        "seconds": percentiles(timings),
+        "throughput": rows / np.median(timings) if rows else 0.0,  # rijen per seconde
+        "rows": rows,
+        "calls": {**{f"places_{k}": v // args.repeats for k, v in stub.calls.items()},
+                  **{f"status_{k}": v // args.repeats for k, v in stub.statuses.items()},
+                  **{k: v // args.repeats for k, v in stats.items() if k.startswith("pages_") or k == "token_retries"},
+                  "token_wait_s": round(stats["token_wait"] / args.repeats, 1),
+                  "website_requests": sum(farm.calls.values()) // args.repeats},
+    }
+
+def bench_emails(size, args):
+    farm = SiteFarm(size).start()
+    urls = [farm.url(i) for i in range(size)]
+    timings, domain_seconds, outcomes = [], [], Counter()
+    try:
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            _, stats = crawl_emails(urls, timeout=EMAIL_TIMEOUT, use_cache=False)
+            timings.append(time.perf_counter() - start)
+            domain_seconds += [entry["seconds"] for entry in stats["domains"].values()]
+            outcomes += stats["outcomes"]
+    finally:
+        farm.stop()
+    return {
+        "seconds": percentiles(timings),
+        "domain_seconds": percentiles(domain_seconds),
+        "throughput": size / np.median(timings),  # domeinen per seconde
+        "calls": {**{f"outcome_{k}": v // args.repeats for k, v in outcomes.items()},
+                  "website_requests": sum(farm.calls.values()) // args.repeats},
+    }
+
+def sheet_history(n):
+    columns = ["Input", "Naam", "Adres", "Latitude", "Longitude", "Telefoon", "Website", "E-mail", "Status", "Datum"]
+    rows = [
+        [f"Getypt: Categorie {i % 50} in Nijmegen", f"Bedrijf {i}", f"Straat {i}", "", "",
+         f"024 {i:07d}", f"https://bedrijf{i}.nl/", f"info@bedrijf{i}.nl", "Nieuw", "01-01-2025 12:00:00"]
+        for i in range(n)
+    ]
+    return [columns] + rows
+
+def sheet_results(size):
+    return pd.DataFrame([
+        {"Input": "Getypt: Restaurant in Nijmegen", "Naam": f"Restaurant {i}", "Adres": f"Markt {i}",
+         "Telefoon": f"024 {i:07d}", "Website": f"https://restaurant{i}.nl/", "E-mail": f"info@restaurant{i}.nl",
+         "Status": "Nieuw", "Datum": "02-01-2025 12:00:00"}
+        for i in range(size)
+    ])
+
+def bench_sheets(size, args):
+    """Eerste upload van een zoekopdracht en daarna dezelfde zoekopdracht nog eens (het gebruikelijke geval)"""
+    timings, calls, bytes_sent = [], Counter(), 0
+    for _ in range(args.repeats):
+        worksheet = FakeWorksheet(sheet_history(size * HISTORY_FACTOR))
+        start = time.perf_counter()
+        for _ in range(2):
+            sheets_utils.upload_to_google_sheets(sheet_results(size), "Restaurant", "Getypt: Restaurant in Nijmegen", worksheet=worksheet, mode="delta")
+        timings.append(time.perf_counter() - start)
+        calls += worksheet.calls
+        bytes_sent += worksheet.bytes_sent
+    return {
+        "seconds": percentiles(timings),
+        "throughput": 2 * size / np.median(timings),  # rijen per seconde
+        "calls": {**{k: v // args.repeats for k, v in calls.items()}, "bytes_sent": bytes_sent // args.repeats},
+    }
+
+SCENARIOS = {"search": bench_search, "emails": bench_emails, "sheets": bench_sheets}
+
+def previous_run(path=None):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    runs = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))
+    if not runs:
+        return None
+    with open(runs[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark van zoeken, e-mailcrawl en sheet-sync")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--latency", type=float, default=LATENCY)
+    parser.add_argument("--over-query-limit", type=float, default=OVER_QUERY_LIMIT)
+    parser.add_argument("--qps", type=float, default=0, help="Places-limiet (0 = geen)")
+    parser.add_argument("--compare", help="JSON van een eerdere run (standaard de laatste in benchmarks/results)")
+    args = parser.parse_args()
+
+    baseline = previous_run(args.compare)
+    baseline_results = {(r["scenario"], r["size"]): r for r in baseline["results"]} if baseline else {}
+    if baseline:
+        print(f"Vergeleken met {baseline['version']} ({baseline['timestamp']})")
+
+    results = []
+    print(f"{'scenario':>8} | {'grootte':>7} | {'p50 s':>7} | {'p90 s':>7} | {'p99 s':>7} | {'doorvoer/s':>10} | {'p50 t.o.v. vorige':>17}")
+    for scenario in args.scenarios:
+        for size in args.sizes:
+            result = {"scenario": scenario, "size": size, **SCENARIOS[scenario](size, args)}
+            results.append(result)
+            seconds = result["seconds"]
+            old = baseline_results.get((scenario, size))
+            change = f"{seconds['p50'] / old['seconds']['p50'] - 1:+.0%}" if old and old["seconds"]["p50"] else "-"
+            print(f"{scenario:>8} | {size:>7} | {seconds['p50']:>7.2f} | {seconds['p90']:>7.2f} | {seconds['p99']:>7.2f} | "
+                  f"{result['throughput']:>10.1f} | {change:>17}")
+            print(f"{'':>8}   calls: " + ", ".join(f"{k}={v}" for k, v in sorted(result["calls"].items())))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    version = git_version()
+    path = os.path.join(RESULTS_DIR, f"{timestamp}-{version}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "timestamp": timestamp, "config": vars(args), "results": results}, f, indent=2)
+    print(f"Resultaten bewaard in {path}")
+
+if __name__ == "__main__":
+    main()
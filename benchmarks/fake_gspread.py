@@ -0,0 +1,84 @@
+"""
+Lokale fake van een gspread Worksheet voor benchmarks: houdt de cellen in het geheugen
+en telt API-calls en verstuurde/ontvangen bytes (als JSON, zoals gspread ze zou versturen).
+Net als gspread (requests) weigert hij NaN en oneindig in wat er verstuurd wordt.
+"""
+import json
+import re
+from collections import Counter
+from itertools import count
+
+_ids = count()
+
+def a1_to_rowcol(label):
+    letters, digits = re.fullmatch(r"([A-Z]+)(\d+)", label.upper()).groups()
+    col = 0
+    for letter in letters:
+        col = col * 26 + ord(letter) - ord("A") + 1
+    return int(digits), col
+
+class FakeWorksheet:
+    def __init__(self, values=None, title="Sheet1"):
+        self.id = next(_ids)
+        self.title = title
+        self.values = [list(row) for row in values or []]
+        self.calls = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def _send(self, method, payload):
+        self.calls[method] += 1
+        self.bytes_sent += len(json.dumps(payload, default=str, allow_nan=False))
+
+    def _receive(self, method, payload):
+        self.calls[method] += 1
+        self.bytes_received += len(json.dumps(payload, default=str))
+        return payload
+
+    def get_all_values(self):
+        return self._receive("get_all_values", [list(row) for row in self.values])
+
+    def get_all_records(self):
+        if not self.values:
+            return self._receive("get_all_records", [])
+        header = self.values[0]
+        records = [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in self.values[1:]]
+        return self._receive("get_all_records", records)
+
+    def col_values(self, col):
+        values = [row[col - 1] if col <= len(row) else "" for row in self.values]
+        while values and values[-1] == "":
+            values.pop()
+        return self._receive("col_values", values)
+
+    def row_values(self, row):
+        return self._receive("row_values", list(self.values[row - 1]) if row <= len(self.values) else [])
+
+    def clear(self):
+        self._send("clear", {})
+        self.values = []
+
+    def update(self, values, range_name=None):
+        self._send("update", values)
+        row, col = a1_to_rowcol(range_name or "A1")
+        for i, new_row in enumerate(values):
+            self._set_row(row + i, col, new_row)
+
+    def batch_update(self, data):
+        self._send("batch_update", data)
+        for entry in data:
+            row, col = a1_to_rowcol(entry["range"])
+            for i, new_row in enumerate(entry["values"]):
+                self._set_row(row + i, col, new_row)
+
+    def append_rows(self, values, **kwargs):
+        self._send("append_rows", values)
+        self.values.extend(list(row) for row in values)
+
+    def _set_row(self, row, col, new_values):
+        while len(self.values) < row:
+            self.values.append([])
+        target = self.values[row - 1]
+        while len(target) < col - 1 + len(new_values):
+            target.append("")
+        target[col - 1:col - 1 + len(new_values)] = new_values
@@ -0,0 +1,163 @@
+"""
+Lokale stub van de Google Places API voor benchmarks.
+Ondersteunt Text Search en Nearby Search met location/radius, paginering via next_page_token
+en het plafond van 60 resultaten per zoekopdracht, net als de echte (legacy) API, plus Place Details.
+Met `latency` wacht elke response een vaste tijd om netwerk- en API-vertraging na te bootsen,
+`token_delay` is de tijd voordat een page token geldig is (daarvoor INVALID_REQUEST) en
+`over_query_limit` het deel van de calls dat OVER_QUERY_LIMIT teruggeeft.
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PAGE_SIZE = 20
+MAX_RESULTS = 60
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Haversine-afstand in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * 6_371_000 * math.asin(math.sqrt(a))
+
+def generate_places(center_lat, center_lon, radius_m, n, seed=42):
+    """
+    Genereer n nepbedrijven rond het centrum: de helft geclusterd rond het centrum (stadskern),
+    de rest gelijkmatig verspreid tot 1.5x de radius.
+    """
+    rng = random.Random(seed)
+    m_per_deg_lon = 111_000 * math.cos(math.radians(center_lat))
+    places = []
+    for i in range(n):
+        if i % 2:
+            r = abs(rng.gauss(0, radius_m / 4))
+        else:
+            r = 1.5 * radius_m * math.sqrt(rng.random())
+        theta = rng.random() * 2 * math.pi
+        places.append({
+            "place_id": f"stub_{i}",
+            "name": f"Bedrijf {i}",
+            "lat": center_lat + r * math.sin(theta) / 111_000,
+            "lng": center_lon + r * math.cos(theta) / m_per_deg_lon,
+            "rank": rng.random(),  # "prominence": bepaalt de volgorde van de resultaten
+            "address": f"Straat {i}, 6511 AB Nijmegen, Nederland",
+            "phone": f"024 {i:07d}",
+            "website": f"https://bedrijf{i}.example.nl/",
+        })
+    return places
+
+class PlacesStub:
+    """Start met start(), gebruik base_url als vervanging van https://maps.googleapis.com/maps/api/place"""
+    def __init__(self, places, latency=0.0, token_delay=0.0, over_query_limit=0.0, seed=42):
+        self.places = sorted(places, key=lambda p: p["rank"])
+        self.by_id = {p["place_id"]: p for p in places}
+        self.latency = latency
+        self.token_delay = token_delay
+        self.over_query_limit = over_query_limit
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.statuses = Counter()
+        self.tokens = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def search(self, params):
+        if "pagetoken" in params:
+            with self.lock:
+                matches, offset, ready_at = self.tokens.get(params["pagetoken"], ([], 0, 0))
+                if time.monotonic() < ready_at:
+                    return {"status": "INVALID_REQUEST"}  # token nog niet geldig, net als bij de echte API
+                self.tokens.pop(params["pagetoken"], None)
+        else:
+            matches, offset = self.places, 0
+            if "location" in params:
+                lat, lon = map(float, params["location"].split(","))
+                radius = float(params.get("radius", 50_000))
+                matches = [p for p in self.places if distance_m(lat, lon, p["lat"], p["lng"]) <= radius]
+            matches = matches[:MAX_RESULTS]
+
+        page = matches[offset:offset + PAGE_SIZE]
+        data = {
+            "status": "OK" if page else "ZERO_RESULTS",
+            "results": [
+                {"place_id": p["place_id"], "name": p["name"], "formatted_address": p["address"],
+                 "geometry": {"location": {"lat": p["lat"], "lng": p["lng"]}}}
+                for p in page
+            ],
+        }
+        if offset + PAGE_SIZE < len(matches):
+            with self.lock:
+                token = f"token_{len(self.tokens)}_{offset}_{id(matches)}"
+                self.tokens[token] = (matches, offset + PAGE_SIZE, time.monotonic() + self.token_delay)
+            data["next_page_token"] = token
+        return data
+
+    def details(self, params):
+        place = self.by_id.get(params.get("place_id"))
+        if not place:
+            return {"status": "NOT_FOUND"}
+        return {
+            "status": "OK",
+            "result": {
+                "name": place["name"],
+                "formatted_address": place["address"],
+                "formatted_phone_number": place["phone"],
+                "website": place["website"],
+            },
+        }
+
+    def handle(self, path, params):
+        endpoint = path.rstrip("/").split("/")[-2]
+        with self.lock:
+            self.calls[endpoint] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            throttled = self.rng.random() < self.over_query_limit
+        if throttled:
+            data = {"status": "OVER_QUERY_LIMIT", "error_message": "Injected by PlacesStub"}
+        elif endpoint in ("textsearch", "nearbysearch"):
+            data = self.search(params)
+        elif endpoint == "details":
+            data = self.details(params)
+        else:
+            data = {"status": "INVALID_REQUEST", "error_message": f"Onbekend endpoint: {path}"}
+        with self.lock:
+            self.statuses[data["status"]] += 1
+        return data
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                body = json.dumps(stub.handle(parsed.path, params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
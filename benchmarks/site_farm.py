@@ -0,0 +1,123 @@
+"""
+Lokale farm van nepwebsites voor benchmarks van de e-mailcrawler.
+Elke site heeft een eigen loopback-adres (127.x.y.z, alle op dezelfde poort), zodat de crawler
+ze als aparte domeinen ziet. Er wordt alleen op die loopback-adressen geluisterd, nooit op 0.0.0.0. Soorten sites:
+  - "contact": e-mailadres op /contact
+  - "home":    e-mailadres alleen op de homepage
+  - "none":    pagina's zonder e-mailadres
+  - "slow":    e-mailadres op /contact, maar elke response duurt `slow_delay` seconden
+  - "dead":    verbinding wordt zonder response gesloten
+Werkt op Linux, waar het hele 127.0.0.0/8-blok naar loopback gaat.
+"""
+import random
+import selectors
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SITE_MIX = {"contact": 0.4, "home": 0.2, "none": 0.2, "slow": 0.1, "dead": 0.1}
+FILLER = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40 + "</p>\n"
+
+def site_ip(i):
+    n = i + 2  # 127.0.0.0 en 127.0.0.1 overslaan
+    return f"127.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+def site_index(ip):
+    _, a, b, c = map(int, ip.split("."))
+    return (a << 16) + (b << 8) + c - 2
+
+class SiteFarm:
+    """Start met start(); url(i) is de homepage van site i"""
+    def __init__(self, n_sites, mix=SITE_MIX, slow_delay=2.0, page_kb=20, seed=42):
+        rng = random.Random(seed)
+        kinds, weights = zip(*mix.items())
+        self.kinds = rng.choices(kinds, weights, k=n_sites)
+        self.slow_delay = slow_delay
+        self.filler = FILLER * max(1, page_kb * 1024 // len(FILLER))
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.servers = []
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def page(self, i, path):
+        """Returnt (statuscode, html) of None om de verbinding te sluiten"""
+        kind = self.kinds[i]
+        with self.lock:
+            self.calls[kind] += 1
+        if kind == "dead":
+            return None
+        if kind == "slow":
+            time.sleep(self.slow_delay)
+        email = f'<a href="mailto:info@bedrijf{i}.nl">info@bedrijf{i}.nl</a>'
+        if path == "/":
+            return 200, f"<html><body><h1>Bedrijf {i}</h1>{self.filler}{email if kind == 'home' else ''}</body></html>"
+        if path == "/contact" and kind in ("contact", "slow"):
+            return 200, f"<html><body><h1>Contact</h1>{self.filler}{email}</body></html>"
+        if kind == "none":
+            return 200, f"<html><body>{self.filler}</body></html>"
+        return 404, "<html><body>Niet gevonden</body></html>"
+
+    def start(self):
+        farm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                i = site_index(self.connection.getsockname()[0])
+                response = farm.page(i, self.path.split("?")[0].rstrip("/") or "/")
+                if response is None:
+                    self.close_connection = True
+                    return
+                status, body = response
+                body = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        # Eén server per site-adres op dezelfde poort; is die poort op een van de adressen bezet, dan een nieuwe kiezen
+        for _ in range(10):
+            try:
+                self.servers = [ThreadingHTTPServer((site_ip(0), 0), Handler)]
+                port = self.servers[0].server_address[1]
+                for i in range(1, len(self.kinds)):
+                    self.servers.append(ThreadingHTTPServer((site_ip(i), port), Handler))
+                break
+            except OSError:
+                self.close_servers()
+        else:
+            raise OSError("geen vrije poort gevonden op alle site-adressen")
+
+        # Alle servers vanuit één thread bedienen; elke request krijgt daarna zijn eigen thread (daemon_threads)
+        selector = selectors.DefaultSelector()
+        for server in self.servers:
+            server.daemon_threads = True
+            selector.register(server, selectors.EVENT_READ, server)
+
+        def serve():
+            with selector:
+                while not self.stopping.is_set():
+                    for key, _ in selector.select(timeout=0.5):
+                        key.data.handle_request()
+
+        self.thread = threading.Thread(target=serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def url(self, i):
+        return f"http://{site_ip(i)}:{self.servers[0].server_address[1]}/"
+
+    def close_servers(self):
+        for server in self.servers:
+            server.server_close()
+        self.servers = []
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        self.close_servers()
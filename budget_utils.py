@@ -0,0 +1,64 @@
+import threading
+from collections import Counter
+from cache_utils import usage_store
+from metrics_utils import API_COST_PER_1000
+
+SEARCH_BUDGET_USD = 10.0  # maximale geschatte Places-kosten van één zoekopdracht; een kaartzoekopdracht tot 2 km past zonder versobering
+USER_DAILY_BUDGET_USD = 50.0  # per gebruiker per dag
+DAILY_BUDGET_USD = 200.0  # alle gebruikers (sessies, batch) samen per dag
+DEFAULT_USER = "anoniem"  # zonder Streamlit-login delen alle sessies het gebruikersbudget
+
+class BudgetExceeded(Exception):
+    """Een Places-call zou het budget van de zoekopdracht, de gebruiker of de dag overschrijden"""
+
+def call_cost(kind):
+    """Geschatte kosten in USD van één call ("textsearch", "nearbysearch" of "details")"""
+    return API_COST_PER_1000[kind] / 1000
+
+def current_user():
+    """De ingelogde Streamlit-gebruiker (als authenticatie aan staat), anders DEFAULT_USER"""
+    import streamlit as st
+
+    try:
+        if st.user.is_logged_in:
+            return st.user.email
+    except (AttributeError, KeyError):
+        pass
+    return DEFAULT_USER
+
+class SearchBudget:
+    """
+    Budget van één zoekopdracht. charge(kind) wordt vóór elke Places-call aangeroepen: de call wordt vooraf
+    afgeboekt in usage_store (gedeeld door alle sessies, ook als de call daarna mislukt) en BudgetExceeded
+    volgt zodra het zoek-, gebruikers- of dagbudget op is. Thread-safe.
+    """
+    def __init__(self, user=DEFAULT_USER, limit=SEARCH_BUDGET_USD, user_limit=USER_DAILY_BUDGET_USD, daily_limit=DAILY_BUDGET_USD, store=usage_store):
+        self.user = user
+        self.limit = limit
+        self.user_limit = user_limit
+        self.daily_limit = daily_limit
+        self.store = store
+        self.spent = 0.0
+        self.calls = Counter()
+        self.exhausted = None  # welk budget op is: "zoekopdracht", "gebruiker" of "dag"
+        self.lock = threading.Lock()
+
+    def available(self):
+        """Wat er nog uitgegeven kan worden: het kleinste van het zoek-, gebruikers- en dagbudget dat over is"""
+        total, own = self.store.spent(self.user)
+        return max(min(self.limit - self.spent, self.user_limit - own, self.daily_limit - total), 0.0)
+
+    def charge(self, kind):
+        cost = call_cost(kind)
+        with self.lock:
+            if self.exhausted or self.spent + cost > self.limit:
+                self.exhausted = self.exhausted or "zoekopdracht"
+                raise BudgetExceeded(f"Budget van de {self.exhausted} voor de Places API is op")
+            self.spent += cost  # vooraf reserveren, zodat gelijktijdige workers samen binnen de limiet blijven
+        exceeded = self.store.charge(self.user, kind, cost, self.daily_limit, self.user_limit)
+        with self.lock:
+            if exceeded:
+                self.spent -= cost
+                self.exhausted = self.exhausted or exceeded
+                raise BudgetExceeded(f"Budget van de {exceeded} voor de Places API is op")
+            self.calls[kind] += 1
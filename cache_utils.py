@@ -0,0 +1,403 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+DETAILS_CACHE_PATH = os.path.join(CACHE_DIR, "place_details.sqlite")
+DETAILS_TTL = 7 * 24 * 3600  # seconden
+DETAILS_MAX_ENTRIES = 50_000
+DETAILS_TOUCH_FLUSH = 500  # zoveel cache hits worden verzameld voordat hun last_used in één keer wordt weggeschreven
+RESULTS_CACHE_PATH = os.path.join(CACHE_DIR, "search_results.sqlite")
+RESULTS_TTL = 24 * 3600  # seconden dat een zoekresultaat standaard vers is
+RESULTS_MAX_ENTRIES = 500
+EMAIL_CACHE_PATH = os.path.join(CACHE_DIR, "emails.sqlite")
+EMAIL_FOUND_TTL = 30 * 24 * 3600  # seconden dat een gevonden e-mailadres vers is
+EMAIL_NONE_TTL = 7 * 24 * 3600  # website bereikt, maar geen e-mailadres
+EMAIL_FAILURE_TTL = 6 * 3600  # eerste timeout/fout; verdubbelt bij elke volgende mislukte poging
+EMAIL_FAILURE_MAX_TTL = 14 * 24 * 3600
+EMAIL_MAX_ENTRIES = 100_000
+SHEET_INDEX_PATH = os.path.join(CACHE_DIR, "sheet_index.sqlite")
+USAGE_PATH = os.path.join(CACHE_DIR, "api_usage.sqlite")
+
+class SqliteStore:
+    """Basis voor de lokale caches: één SQLite-bestand, lazy geopend en gedeeld door alle threads achter een lock"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.create_tables(self.conn)
+        return self.conn
+
+    def create_tables(self, conn):
+        raise NotImplementedError
+
+class DetailsCache(SqliteStore):
+    """
+    Persistente cache voor Place Details, gedeeld door alle Streamlit-sessies.
+      - Key: place_id + gevraagde velden; een entry met meer velden kan ook een kleinere aanvraag beantwoorden.
+      - Elke entry heeft een eigen vervaltijd (TTL).
+      - Boven max_entries worden de minst recent gebruikte entries verwijderd (LRU). last_used van een hit
+        wordt eerst in het geheugen bijgehouden en per batch weggeschreven (zie flush), niet met een commit per hit.
+      - Houdt hits en misses bij.
+    """
+    def __init__(self, path=DETAILS_CACHE_PATH, ttl=DETAILS_TTL, max_entries=DETAILS_MAX_ENTRIES):
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.touched = {}  # (place_id, fields) -> tijdstip van de laatste hit, nog niet weggeschreven
+
+    def create_tables(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS details ("
+            " place_id TEXT, fields TEXT, result TEXT, expires_at REAL, last_used REAL,"
+            " PRIMARY KEY (place_id, fields))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_details_last_used ON details (last_used)")
+
+    @staticmethod
+    def fields_key(fields):
+        return ",".join(sorted(f.strip() for f in fields.split(",") if f.strip()))
+
+    def get(self, place_id, fields):
+        """Returnt het gecachte resultaat (alleen de gevraagde velden) of None"""
+        wanted = set(self.fields_key(fields).split(","))
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            rows = conn.execute(
+                "SELECT fields, result FROM details WHERE place_id = ? AND expires_at > ?", (place_id, now)
+            ).fetchall()
+            for cached_fields, result in rows:
+                if wanted <= set(cached_fields.split(",")):
+                    self.touched[(place_id, cached_fields)] = now
+                    if len(self.touched) >= DETAILS_TOUCH_FLUSH:
+                        self.write_touched(conn)
+                        conn.commit()
+                    self.hits += 1
+                    return {k: v for k, v in json.loads(result).items() if k in wanted}
+            self.misses += 1
+            return None
+
+    def set(self, place_id, fields, result, ttl=None):
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO details VALUES (?, ?, ?, ?, ?)",
+                (place_id, self.fields_key(fields), json.dumps(result), now + (ttl or self.ttl), now)
+            )
+            self.write_touched(conn)  # vóór het evicten, zodat recent gebruikte entries blijven
+            self.evict(conn, now)
+            conn.commit()
+
+    def write_touched(self, conn):
+        if self.touched:
+            conn.executemany(
+                "UPDATE details SET last_used = ? WHERE place_id = ? AND fields = ?",
+                [(used, place_id, fields) for (place_id, fields), used in self.touched.items()]
+            )
+            self.touched = {}
+
+    def flush(self):
+        """last_used van de verzamelde hits wegschrijven (één executemany en één commit)"""
+        with self.lock:
+            if self.touched:
+                conn = self.connect()
+                self.write_touched(conn)
+                conn.commit()
+
+    def evict(self, conn, now):
+        conn.execute("DELETE FROM details WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM details").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM details WHERE rowid IN (SELECT rowid FROM details ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def invalidate(self, place_id):
+        with self.lock:
+            conn = self.connect()
+            conn.execute("DELETE FROM details WHERE place_id = ?", (place_id,))
+            conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+class ResultCache(SqliteStore):
+    """
+    Persistente cache voor complete zoekresultaten (DataFrames), gedeeld door alle Streamlit-sessies.
+    Bewaart per key ook hoeveel API-calls de oorspronkelijke zoekopdracht kostte,
+    zodat bijgehouden kan worden hoeveel calls de cache bespaart.
+    """
+    def __init__(self, path=RESULTS_CACHE_PATH, max_entries=RESULTS_MAX_ENTRIES):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.calls_saved = 0
+
+    def create_tables(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, df BLOB, api_calls INTEGER, created REAL)"
+        )
+
+    def get(self, key, max_age=RESULTS_TTL):
+        """Returnt (df, api_calls, leeftijd in seconden) als er een resultaat jonger dan max_age is, anders None"""
+        with self.lock:
+            row = self.connect().execute(
+                "SELECT df, api_calls, created FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or time.time() - row[2] > max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.calls_saved += row[1]
+            return pickle.loads(row[0]), row[1], time.time() - row[2]
+
+    def set(self, key, df, api_calls):
+        with self.lock:
+            conn = self.connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(df), api_calls, time.time())
+            )
+            conn.execute(
+                "DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY created DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits, "misses": self.misses, "calls_saved": self.calls_saved,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+class EmailCache(SqliteStore):
+    """
+    Persistente cache domein -> e-mailadres, gedeeld door alle sessies en zoekopdrachten.
+      - "found" en "none" (negatieve cache) hebben elk een eigen TTL.
+      - "timeout" en "error" krijgen een backoff: de TTL verdubbelt bij elke opeenvolgende mislukte crawl.
+      - Boven max_entries worden de langst niet bijgewerkte domeinen verwijderd.
+    """
+    FAILURES = ("timeout", "error")
+
+    def __init__(self, path=EMAIL_CACHE_PATH, max_entries=EMAIL_MAX_ENTRIES):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def create_tables(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS emails ("
+            " domain TEXT PRIMARY KEY, email TEXT, outcome TEXT, failures INTEGER, expires_at REAL, updated REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_emails_updated ON emails (updated)")
+
+    @staticmethod
+    def ttl(outcome, failures):
+        if outcome == "found":
+            return EMAIL_FOUND_TTL
+        if outcome == "none":
+            return EMAIL_NONE_TTL
+        return min(EMAIL_FAILURE_TTL * 2 ** (failures - 1), EMAIL_FAILURE_MAX_TTL)
+
+    def get_many(self, domains):
+        """Returnt domein -> (e-mail, uitkomst) voor alle domeinen met een verse entry"""
+        domains = list(domains)
+        fresh = {}
+        with self.lock:
+            conn = self.connect()
+            now = time.time()
+            for start in range(0, len(domains), 500):  # SQLite-limiet op het aantal parameters
+                chunk = domains[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT domain, email, outcome FROM emails WHERE expires_at > ? AND domain IN ({','.join('?' * len(chunk))})",
+                    (now, *chunk)
+                ).fetchall()
+                fresh.update((domain, (email, outcome)) for domain, email, outcome in rows)
+            self.hits += len(fresh)
+            self.misses += len(domains) - len(fresh)
+        return fresh
+
+    def set_many(self, entries):
+        """
+        Sla (domein, e-mail, uitkomst) op in één transactie. Alleen afgeronde crawls horen hier:
+        "found", "none", "timeout" of "error" (niet "deadline" of "cancelled").
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            failed = [domain for domain, _, outcome in entries if outcome in self.FAILURES]
+            previous = dict(conn.execute(
+                f"SELECT domain, failures FROM emails WHERE domain IN ({','.join('?' * len(failed))})", failed
+            ).fetchall()) if failed else {}
+            rows = []
+            for domain, email, outcome in entries:
+                failures = previous.get(domain, 0) + 1 if outcome in self.FAILURES else 0
+                rows.append((domain, email, outcome, failures, now + self.ttl(outcome, failures), now))
+            conn.executemany("INSERT OR REPLACE INTO emails VALUES (?, ?, ?, ?, ?, ?)", rows)
+            conn.execute(
+                "DELETE FROM emails WHERE domain NOT IN (SELECT domain FROM emails ORDER BY updated DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            conn.commit()
+
+    def invalidate(self, domain):
+        with self.lock:
+            conn = self.connect()
+            conn.execute("DELETE FROM emails WHERE domain = ?", (domain,))
+            conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+class SheetIndex(SqliteStore):
+    """
+    Lokale index van de gepartitioneerde Google Sheet:
+      - partitie-key -> worksheet-titel, gid en wanneer er voor het laatst gearchiveerd is
+      - zoekcontext (Input, in kleine letters) -> partitie en rijbereik in die worksheet
+    Zo hoeft de spreadsheet niet doorzocht te worden om de juiste worksheet of rijen te vinden.
+    """
+    def create_tables(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS partitions ("
+            " key TEXT PRIMARY KEY, title TEXT, gid INTEGER, archived_at REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS contexts ("
+            " input TEXT PRIMARY KEY, key TEXT, first_row INTEGER, last_row INTEGER, n_rows INTEGER, updated REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_contexts_key ON contexts (key)")
+
+    def get_partition(self, key):
+        """Returnt (titel, gid, archived_at) of None"""
+        with self.lock:
+            return self.connect().execute(
+                "SELECT title, gid, archived_at FROM partitions WHERE key = ?", (key,)
+            ).fetchone()
+
+    def set_partition(self, key, title, gid):
+        with self.lock:
+            conn = self.connect()
+            conn.execute(
+                "INSERT INTO partitions VALUES (?, ?, ?, 0) ON CONFLICT(key) DO UPDATE SET title = excluded.title, gid = excluded.gid",
+                (key, title, gid)
+            )
+            conn.commit()
+
+    def mark_archived(self, key, when=None):
+        with self.lock:
+            conn = self.connect()
+            conn.execute("UPDATE partitions SET archived_at = ? WHERE key = ?", (when or time.time(), key))
+            conn.commit()
+
+    def set_contexts(self, key, ranges):
+        """Vervang alle zoekcontexten van een partitie; ranges: input -> (eerste rij, laatste rij, aantal rijen)"""
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            conn.execute("DELETE FROM contexts WHERE key = ?", (key,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO contexts VALUES (?, ?, ?, ?, ?, ?)",
+                [(input_text.lower(), key, first, last, n, now) for input_text, (first, last, n) in ranges.items()]
+            )
+            conn.commit()
+
+    def get_context(self, input_text):
+        """Returnt (partitie-key, titel, gid, eerste rij, laatste rij, aantal rijen) of None"""
+        with self.lock:
+            return self.connect().execute(
+                "SELECT c.key, p.title, p.gid, c.first_row, c.last_row, c.n_rows"
+                " FROM contexts c JOIN partitions p ON p.key = c.key WHERE c.input = ?",
+                (input_text.lower(),)
+            ).fetchone()
+
+class UsageStore(SqliteStore):
+    """
+    Persistent verbruik van de Places API per dag, gebruiker en soort call (calls en geschatte kosten in USD),
+    gedeeld door alle sessies en processen. charge() controleert de limieten en boekt af in één transactie,
+    zodat gelijktijdige zoekopdrachten samen binnen hetzelfde budget blijven.
+    """
+    def create_tables(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            " day TEXT, user TEXT, kind TEXT, calls INTEGER, cost REAL,"
+            " PRIMARY KEY (day, user, kind))"
+        )
+
+    @staticmethod
+    def today():
+        return time.strftime("%Y-%m-%d")
+
+    def charge(self, user, kind, cost, daily_limit=None, user_limit=None):
+        """
+        Boek één call af, tenzij daarmee het dagbudget (alle gebruikers) of het budget van user overschreden wordt.
+        Returnt None als de call afgeboekt is, anders "dag" of "gebruiker".
+        """
+        day = self.today()
+        with self.lock:
+            conn = self.connect()
+            conn.execute("BEGIN IMMEDIATE")  # schrijflock, ook tegen andere processen
+            try:
+                total, own = conn.execute(
+                    "SELECT COALESCE(SUM(cost), 0), COALESCE(SUM(CASE WHEN user = ? THEN cost END), 0)"
+                    " FROM usage WHERE day = ?", (user, day)
+                ).fetchone()
+                if daily_limit is not None and total + cost > daily_limit:
+                    conn.rollback()
+                    return "dag"
+                if user_limit is not None and own + cost > user_limit:
+                    conn.rollback()
+                    return "gebruiker"
+                conn.execute(
+                    "INSERT INTO usage VALUES (?, ?, ?, 1, ?)"
+                    " ON CONFLICT (day, user, kind) DO UPDATE SET calls = calls + 1, cost = cost + excluded.cost",
+                    (day, user, kind, cost)
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return None
+
+    def spent(self, user=None, day=None):
+        """Returnt (kosten van alle gebruikers, kosten van user) op day (standaard vandaag)"""
+        with self.lock:
+            return self.connect().execute(
+                "SELECT COALESCE(SUM(cost), 0), COALESCE(SUM(CASE WHEN user = ? THEN cost END), 0)"
+                " FROM usage WHERE day = ?", (user, day or self.today())
+            ).fetchone()
+
+    def usage(self, day=None):
+        """Verbruik op day (standaard vandaag): lijst van (user, kind, calls, kosten)"""
+        with self.lock:
+            return self.connect().execute(
+                "SELECT user, kind, calls, cost FROM usage WHERE day = ? ORDER BY user, kind", (day or self.today(),)
+            ).fetchall()
+
+details_cache = DetailsCache()
+result_cache = ResultCache()
+email_cache = EmailCache()
+sheet_index = SheetIndex(SHEET_INDEX_PATH)
+usage_store = UsageStore(USAGE_PATH)
@@ -0,0 +1,20 @@
+import json
+import os
+
+def get_secret(section, key=None, env_var=None):
+    """
+    Secret uit een omgevingsvariabele (voor de CLI en workers zonder secrets.toml), anders uit st.secrets.
+    Voor een hele sectie (key=None) mag de omgevingsvariabele JSON bevatten of een pad naar een JSON-bestand.
+    """
+    value = os.environ.get(env_var) if env_var else None
+    if value:
+        if key is not None:
+            return value
+        if os.path.isfile(value):
+            with open(value, encoding="utf-8") as f:
+                return json.load(f)
+        return json.loads(value)
+    import streamlit as st
+
+    values = st.secrets[section]
+    return values if key is None else values[key]
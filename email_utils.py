@@ -0,0 +1,326 @@
+import asyncio
+import codecs
+import html
+import queue
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import copy_context
+from urllib.parse import urlparse, urljoin
+from cache_utils import email_cache
+from metrics_utils import record
+
+COMMON_PATHS = ["/contact", "/contact-us", "/contacten", "/about", "/over-ons", "/impressum", "/contact.html"]
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+EMAIL_TIMEOUT = 6  # seconden voor verbinden en per leesactie van een pagina
+CRAWL_DEADLINE = 60  # seconden voor de hele crawl
+MAX_CONNECTIONS = 100  # gelijktijdige verbindingen in totaal
+PER_HOST_LIMIT = 4  # gelijktijdige verbindingen per website
+MAX_PAGE_BYTES = 512 * 1024  # er wordt nooit meer dan dit van een pagina gelezen
+CHUNK_SIZE = 16 * 1024
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+MAILTO_RE = re.compile(r'href=["\']mailto:([^"\']+)["\']', flags=re.I)
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}")
+CFEMAIL_RE = re.compile(r'(?:data-cfemail=|/cdn-cgi/l/email-protection#)["\']?([0-9a-fA-F]{4,})["\']', flags=re.I)
+
+def decode_cfemail(encoded):
+    """Decodeer een Cloudflare-beschermd e-mailadres: de eerste byte is de XOR-sleutel voor de rest"""
+    try:
+        key = int(encoded[:2], 16)
+        return "".join(chr(int(encoded[i:i + 2], 16) ^ key) for i in range(2, len(encoded) - 1, 2))
+    except ValueError:
+        return None
+
+def is_html(content_type):
+    return not content_type or content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+class EmailScanner:
+    """
+    Zoekt een e-mailadres in een pagina die in stukken (bytes) binnenkomt.
+      - Een mailto-link of Cloudflare-adres is zeker; daarmee stopt de scan direct.
+      - Een los e-mailadres is zeker als het bij het domein van de website hoort, anders een kandidaat.
+      - HTML-entities (bijv. info&#64;bedrijf.nl) worden gedecodeerd.
+      - Een deel van de vorige chunk wordt opnieuw gescand, zodat adressen over chunkgrenzen gevonden worden.
+      - Na max_bytes is `exhausted` True.
+    """
+    OVERLAP = 512
+
+    def __init__(self, domain=None, encoding=None, max_bytes=MAX_PAGE_BYTES):
+        self.domain = (domain or "").lower().removeprefix("www.")
+        self.decoder = codecs.getincrementaldecoder(self.lookup_encoding(encoding))(errors="ignore")
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.tail = ""
+        self.candidate = None
+
+    @staticmethod
+    def lookup_encoding(encoding):
+        try:
+            return codecs.lookup(encoding or "utf-8").name
+        except LookupError:
+            return "utf-8"
+
+    @property
+    def exhausted(self):
+        return self.bytes_read >= self.max_bytes
+
+    def feed(self, chunk):
+        """Verwerk een chunk bytes; returnt een zeker e-mailadres of None"""
+        chunk = chunk[:self.max_bytes - self.bytes_read]
+        self.bytes_read += len(chunk)
+        return self.scan(self.decoder.decode(chunk), final=self.exhausted)
+
+    def finish(self):
+        """Einde van de pagina: returnt het beste gevonden adres (of None)"""
+        return self.scan(self.decoder.decode(b"", final=True), final=True) or self.candidate
+
+    def scan(self, text, final):
+        buffer = self.tail + text
+        self.tail = buffer[-self.OVERLAP:]
+
+        for m in CFEMAIL_RE.finditer(buffer):
+            email = decode_cfemail(m.group(1))
+            if email and EMAIL_RE.fullmatch(email):
+                return email
+
+        decoded = html.unescape(buffer)
+        m = MAILTO_RE.search(decoded)
+        if m:
+            return m.group(1).split("?")[0]
+
+        for m in EMAIL_RE.finditer(decoded):
+            # Een match aan het eind van de buffer kan nog doorlopen in de volgende chunk
+            if m.end() == len(decoded) and not final:
+                continue
+            email = m.group(0)
+            if self.domain and email.lower().split("@")[1].removeprefix("www.") == self.domain:
+                return email
+            if self.candidate is None:
+                self.candidate = email
+        return None
+
+def group_by_domain(urls):
+    """Eén website-URL per domein"""
+    domain_map = {}
+    for url in urls:
+        try:
+            domain = urlparse(url).netloc
+            if domain:
+                domain_map.setdefault(domain, url)
+        except Exception:
+            continue
+    return domain_map
+
+async def probe_url(session, url):
+    async with session.get(url, headers=HEADERS, allow_redirects=True) as response:
+        size = 0
+        try:
+            if response.status != 200 or not is_html(response.headers.get("Content-Type")):
+                return None
+            scanner = EmailScanner(urlparse(url).netloc, response.charset)
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                email = scanner.feed(chunk)
+                if email:
+                    return email
+                if scanner.exhausted:
+                    break
+            return scanner.finish()
+        finally:
+            record(calls=1, bytes=size, status=response.status)
+
+async def crawl_domain(session, base_url):
+    """
+    Probeer alle contactpagina's en de homepage van één domein tegelijk.
+    Zodra één pagina een e-mailadres oplevert worden de overige probes geannuleerd.
+    Returnt (email, outcome) met outcome "found", "none" (alle probes zonder fout afgerond, geen adres),
+    "timeout" of "error" (minstens één probe mislukt).
+    """
+    parsed = urlparse(base_url)
+    base = f"{parsed.scheme}://{parsed.netloc}/"
+    tasks = [asyncio.create_task(probe_url(session, urljoin(base, path))) for path in COMMON_PATHS + ["/"]]
+    failures = Counter()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                email = await next_done
+            except asyncio.TimeoutError:
+                failures["timeout"] += 1
+                record(calls=1, errors=1, status="timeout")
+                continue
+            except Exception:
+                failures["error"] += 1
+                record(calls=1, errors=1, status="error")
+                continue
+            if email:
+                return email, "found"
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Alleen "none" (lang gecachet) als elke pagina echt bekeken is; anders kan het adres op een mislukte pagina staan
+    if not failures:
+        return None, "none"
+    return None, "timeout" if failures["timeout"] else "error"
+
+async def crawl_emails_async(urls, deadline=CRAWL_DEADLINE, max_connections=MAX_CONNECTIONS, per_host_limit=PER_HOST_LIMIT, timeout=EMAIL_TIMEOUT, on_result=None, cancel_event=None, use_cache=True):
+    """
+    Zie crawl_emails. urls mag ook een queue.Queue zijn met lijsten van URLs en None als einde (zie EmailCrawl):
+    nieuwe domeinen worden dan gecrawld zodra ze binnenkomen en de deadline gaat pas in als de invoer compleet is.
+    """
+    source = urls if isinstance(urls, queue.Queue) else None
+    results = {}
+    stats = {"domains": {}, "outcomes": Counter(), "cached": 0}
+    crawling = {}  # domein -> URL, alleen de domeinen die echt gecrawld worden
+    tasks = {}
+    pending = set()
+    session = None
+
+    async def timed(domain, url):
+        start = time.monotonic()
+        try:
+            email, outcome = await crawl_domain(session, url)
+        finally:
+            stats["domains"][domain] = {"seconds": time.monotonic() - start}
+        results[domain] = email
+        stats["domains"][domain]["outcome"] = outcome
+        if on_result:
+            on_result(domain, email)
+
+    def start(new_urls):
+        nonlocal session
+        domain_map = {domain: url for domain, url in group_by_domain(new_urls).items() if domain not in results}
+        results.update(dict.fromkeys(domain_map))
+        # Domeinen met een verse cache-entry (ook "geen e-mail" en recente timeouts) niet opnieuw crawlen
+        if use_cache and domain_map:
+            for domain, (email, outcome) in email_cache.get_many(domain_map).items():
+                results[domain] = email
+                stats["domains"][domain] = {"seconds": 0.0, "outcome": outcome, "cached": True}
+                stats["cached"] += 1
+                del domain_map[domain]
+                if on_result:
+                    on_result(domain, email)
+        if domain_map and session is None:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=per_host_limit, ttl_dns_cache=300)
+            # Geen total-timeout: die telt ook het wachten op een vrije verbinding mee (per_host_limit), waardoor
+            # probes in de wachtrij verlopen voordat ze iets versturen. De crawl-deadline begrenst de totale duur.
+            client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+            session = aiohttp.ClientSession(connector=connector, timeout=client_timeout)
+        for domain, url in domain_map.items():
+            crawling[domain] = url
+            task = asyncio.create_task(timed(domain, url))
+            tasks[task] = domain
+            pending.add(task)
+
+    closed = source is None
+    if closed:
+        start(urls)
+    stop_at = time.monotonic() + deadline if closed else None
+    try:
+        while True:
+            while not closed:
+                try:
+                    batch = source.get_nowait()
+                except queue.Empty:
+                    break
+                if batch is None:
+                    closed = True
+                    stop_at = time.monotonic() + deadline
+                else:
+                    start(batch)
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if closed and (not pending or time.monotonic() >= stop_at):
+                break
+            wait_s = 0.2 if stop_at is None else max(min(0.2, stop_at - time.monotonic()), 0)
+            if pending:
+                _, pending = await asyncio.wait(pending, timeout=wait_s)
+            else:
+                await asyncio.sleep(wait_s)
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if session is not None:
+            await session.close()
+
+    cancelled = cancel_event is not None and cancel_event.is_set()
+    for domain in crawling:
+        entry = stats["domains"].setdefault(domain, {"seconds": deadline})
+        entry.setdefault("outcome", "cancelled" if cancelled else "deadline")
+    for entry in stats["domains"].values():
+        stats["outcomes"][entry["outcome"]] += 1
+    if use_cache:
+        email_cache.set_many(
+            (domain, results[domain], stats["domains"][domain]["outcome"]) for domain in crawling
+            if stats["domains"][domain]["outcome"] in ("found", "none", "timeout", "error")
+        )
+    return results, stats
+
+class EmailCrawl:
+    """
+    Een e-mailcrawl die websites aanneemt terwijl hij loopt, bijv. zodra hun Place Details binnen zijn.
+    add(urls) mag vanuit elke thread; de crawl (asyncio) draait in een eigen thread met de meting van de aanmaker.
+    on_result(domein, e-mail) wordt alleen in de aanroepende thread aangeroepen, vanuit poll() en finish().
+    Verder dezelfde opties als crawl_emails.
+    """
+    def __init__(self, on_result=None, **kwargs):
+        self.on_result = on_result
+        self.source = queue.Queue()
+        self.done = queue.Queue()
+        self.outcome = None
+        self.error = None
+        kwargs["on_result"] = lambda domain, email: self.done.put((domain, email))
+        context = copy_context()
+        self.thread = threading.Thread(target=context.run, args=(self.run, kwargs), daemon=True)
+        self.thread.start()
+
+    def run(self, kwargs):
+        try:
+            self.outcome = asyncio.run(crawl_emails_async(self.source, **kwargs))
+        except Exception as e:
+            self.error = e
+
+    def add(self, urls):
+        if urls:
+            self.source.put(list(urls))
+
+    def poll(self):
+        """Roep on_result aan voor de domeinen die sinds de vorige keer klaar zijn"""
+        while True:
+            try:
+                domain, email = self.done.get_nowait()
+            except queue.Empty:
+                return
+            if self.on_result:
+                self.on_result(domain, email)
+
+    def finish(self):
+        """Geen nieuwe websites meer; wacht tot de crawl klaar is. Returnt (results, stats) zoals crawl_emails"""
+        self.source.put(None)
+        while self.thread.is_alive():
+            self.thread.join(0.2)
+            self.poll()
+        self.poll()
+        if self.error is not None:
+            raise self.error
+        return self.outcome
+
+def crawl_emails(urls, **kwargs):
+    """
+    Zoek e-mailadressen voor alle websites tegelijk (asyncio).
+      - Per website maximaal `per_host_limit` verbindingen, in totaal `max_connections`.
+      - Na `deadline` seconden, of zodra cancel_event gezet wordt, worden alle lopende crawls gestopt.
+      - on_result(domein, e-mail) wordt aangeroepen zodra een domein klaar is.
+      - Met use_cache worden domeinen met een verse entry in email_cache overgeslagen en nieuwe uitkomsten opgeslagen.
+    Returnt (results, stats): results is domein -> e-mail, stats bevat per domein de duur en uitkomst
+    ("found", "none", "timeout", "error", "deadline" of "cancelled"), de totalen per uitkomst
+    en het aantal domeinen uit de cache.
+    """
+    return asyncio.run(crawl_emails_async(urls, **kwargs))
@@ -0,0 +1,87 @@
+import importlib.util
+from io import BytesIO
+import numpy as np
+import pandas as pd
+
+EXPORT_CACHE_ENTRIES = 8  # aantal exportbestanden dat bewaard blijft (gedeeld door alle sessies)
+
+EXPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+def available_formats():
+    """Parquet alleen aanbieden als pyarrow geïnstalleerd is"""
+    formats = ["Excel", "CSV"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        formats.append("Parquet")
+    return formats
+
+def to_excel_bytes(df):
+    """
+    Schrijf een Excel-bestand met xlsxwriter in constant_memory-modus:
+    rijen worden één voor één naar tijdelijke bestanden geschreven in plaats van het hele werkboek in het geheugen te houden.
+    """
+    import xlsxwriter
+
+    buffer = BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True, "nan_inf_to_errors": True})
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, [str(col) for col in df.columns])
+    for i, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        # NumPy-scalars (bijv. float32-kolommen uit een compacte ResultSet) als gewone Python-waarden
+        worksheet.write_row(i, 0, [None if pd.isna(value) else value.item() if isinstance(value, np.generic) else value for value in row])
+    workbook.close()
+    return buffer.getvalue()
+
+def to_csv_bytes(df):
+    # utf-8-sig zodat Excel accenten goed toont
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+def to_parquet_bytes(df):
+    buffer = BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+_cached_export = None  # build_export met st.cache_data, pas bij het eerste gebruik aangemaakt
+
+def make_export(fingerprint, export_format, _df):
+    if export_format == "Excel":
+        return to_excel_bytes(_df)
+    if export_format == "CSV":
+        return to_csv_bytes(_df)
+    return to_parquet_bytes(_df)
+
+def build_export(fingerprint, export_format, _df):
+    """
+    Exportbestand als bytes; gecachet per resultatenset (fingerprint) en formaat, _df wordt niet gehasht.
+    De cache (st.cache_data) wordt pas hier aangemaakt, zodat de CLI die alleen to_*_bytes gebruikt streamlit niet laadt.
+    """
+    global _cached_export
+    if _cached_export is None:
+        import streamlit as st
+
+        _cached_export = st.cache_data(max_entries=EXPORT_CACHE_ENTRIES, show_spinner="Exportbestand maken...")(make_export)
+    return _cached_export(fingerprint, export_format, _df)
+
+def render_export(df, fingerprint, filename="resultaten", key="export"):
+    """
+    Downloadknop die het bestand pas maakt als erom gevraagd wordt.
+    Gewone reruns (klikken, kaart verschuiven) doen niets met de export tot er op "Exportbestand maken" geklikt is.
+    """
+    import streamlit as st
+
+    export_format = st.selectbox("Exportformaat", available_formats(), key=f"{key}_format")
+    if st.button("Exportbestand maken", key=f"{key}_build"):
+        st.session_state[f"{key}_ready"] = (fingerprint, export_format)
+
+    if st.session_state.get(f"{key}_ready") == (fingerprint, export_format):
+        extension, mime = EXPORT_FORMATS[export_format]
+        st.download_button(
+            label=f"Download {export_format}-bestand",
+            data=build_export(fingerprint, export_format, df),
+            file_name=f"{filename}.{extension}",
+            mime=mime,
+            key=f"{key}_download"
+        )
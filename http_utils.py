@@ -0,0 +1,98 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from metrics_utils import record, record_api_call
+
+POOL_SIZE = 32  # keep-alive connecties per host
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5  # seconden; verdubbelt per poging
+RETRY_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(name="default"):
+    """
+    Gedeelde requests.Session per naam (bijv. "places" of "web"), zodat TLS-verbindingen
+    hergebruikt worden in plaats van per request opnieuw opgezet.
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[name] = session
+        return session
+
+class TokenBucket:
+    """Thread-safe token bucket: gemiddeld `rate` calls per seconde, bursts tot `capacity`. rate 0/None = geen limiet"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate or 1, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate, capacity=None):
+        """Limiet aanpassen terwijl de bucket in gebruik is: de burst wordt capacity (standaard rate) en de tokens worden daartoe begrensd"""
+        with self.lock:
+            self.rate = rate
+            self.capacity = capacity or max(rate or 1, 1)
+            self.tokens = min(self.tokens, self.capacity)
+            self.updated = time.monotonic()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_s = (1 - self.tokens) / self.rate
+            time.sleep(wait_s)
+
+def backoff_delay(attempt):
+    """Exponentiële backoff met jitter"""
+    return BACKOFF_BASE * (2 ** attempt) * (0.5 + random.random() / 2)
+
+def get_json(url, params=None, limiter=None, session="places", timeout=30, max_retries=MAX_RETRIES):
+    """
+    GET-request via een gedeelde sessie; returnt de JSON-response.
+    Probeert opnieuw met exponentiële backoff bij 5xx, verbindingsfouten en OVER_QUERY_LIMIT.
+    Na de laatste poging wordt de fout doorgegeven (of de laatste response teruggegeven).
+    """
+    for attempt in range(max_retries + 1):
+        if limiter:
+            limiter.acquire()
+        last_attempt = attempt == max_retries
+        try:
+            response = get_session(session).get(url, params=params, timeout=timeout)
+            if response.status_code >= 500 and not last_attempt:
+                record_api_call(url, response.status_code, len(response.content))
+                time.sleep(backoff_delay(attempt))
+                continue
+            if response.status_code >= 400:
+                record_api_call(url, response.status_code, len(response.content))
+            response.raise_for_status()
+            data = response.json()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            record(calls=1, errors=1, status=type(e).__name__)
+            if last_attempt:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        record_api_call(url, data.get("status"), len(response.content))
+
+        if data.get("status") in RETRY_STATUSES and not last_attempt:
+            time.sleep(backoff_delay(attempt))
+            continue
+        return data
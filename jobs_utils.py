@@ -0,0 +1,95 @@
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from notify_utils import redirect_notifications
+from metrics_utils import Metrics, collecting
+from search_utils import run_search_cached
+from sheets_utils import upload_to_google_sheets, sheet_url
+
+JOB_RETENTION = 3600  # seconden dat een afgeronde job bewaard blijft
+
+# Alle jobs in dit proces (gedeeld door de Streamlit-sessies); in st.session_state staat alleen het job ID
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+class SearchJob:
+    """
+    Een zoekopdracht die in een achtergrondthread draait.
+    Houdt tussentijdse rijen, meldingen en voortgang bij, zodat de UI die tijdens het zoeken kan tonen.
+    status: "running", "done", "cancelled" of "failed".
+    """
+    def __init__(self, collect_metrics=False):
+        self.id = uuid.uuid4().hex
+        self.status = "running"
+        self.rows = {}  # place_id -> rij, in volgorde van binnenkomst
+        self.messages = []  # (level, melding)
+        self.progress = (0.0, None)
+        self.result = None  # (df_active, input_text, filename)
+        self.error = None
+        self.sheet_url = None  # link naar de worksheet (en rijen) van deze zoekopdracht
+        self.cancel_event = threading.Event()
+        self.metrics = Metrics() if collect_metrics else None  # metingen per stap, zie metrics_utils
+        self.started = time.time()
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def sink(self, level, message):
+        with self.lock:
+            if level == "progress":
+                self.progress = message
+            else:
+                self.messages.append((level, message))
+
+    def update_rows(self, rows):
+        with self.lock:
+            for key, row in rows:
+                self.rows.setdefault(key, {}).update(row)
+
+    def snapshot(self):
+        """Returnt (status, rijen, meldingen, voortgang) als kopie, veilig om in de UI te gebruiken"""
+        with self.lock:
+            return self.status, [dict(row) for row in self.rows.values()], list(self.messages), self.progress
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self, search_kwargs, category_input):
+        with redirect_notifications(self.sink), (collecting(self.metrics) if self.metrics else nullcontext()):
+            try:
+                df, input_text, filename = run_search_cached(
+                    **search_kwargs, on_rows=self.update_rows, cancel_event=self.cancel_event
+                )
+                if self.cancel_event.is_set():
+                    self.status = "cancelled"
+                    return
+                if df is not None and not df.empty:
+                    df = upload_to_google_sheets(df, category_input, input_text)
+                    self.sheet_url = sheet_url(category_input, input_text)
+                self.result = (df, input_text, filename)
+                self.status = "done"
+            except Exception as e:
+                self.error = str(e)
+                self.status = "failed"
+            finally:
+                self.finished = time.time()
+
+def start_search_job(search_kwargs, category_input, collect_metrics=False):
+    """Start run_search_cached (+ upload naar Google Sheets) op de achtergrond; returnt het job ID"""
+    job = SearchJob(collect_metrics)
+    with _jobs_lock:
+        now = time.time()
+        for job_id in [j for j, old in _jobs.items() if old.finished and now - old.finished > JOB_RETENTION]:
+            del _jobs[job_id]
+        _jobs[job.id] = job
+    threading.Thread(target=job.run, args=(search_kwargs, category_input), daemon=True, name=f"search-{job.id}").start()
+    return job.id
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+def cancel_job(job_id):
+    job = get_job(job_id)
+    if job:
+        job.cancel()
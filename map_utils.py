@@ -1,21 +1,83 @@
+import html
 import numpy as np
+import pandas as pd
 import streamlit as st
-import folium
-from folium.plugins import MarkerCluster
 from streamlit import session_state
-from streamlit_folium import st_folium
+from results_utils import results_fingerprint
+
+FAST_CLUSTER_THRESHOLD = 500  # boven dit aantal markers clustert de browser zelf (FastMarkerCluster)
+MARKER_LAYER_CACHE_SIZE = 2  # aantal marker-lagen dat per sessie bewaard blijft
+
+# Markers worden pas in de browser aangemaakt; popup-HTML zit al in de data
+FAST_CLUSTER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2]);
+    return marker;
+};
+"""
+
+def build_marker_layer(markers):
+    """
+    Bouw de markerlaag en de bounds van de resultaten (een DataFrame met Latitude, Longitude, Naam en Adres).
+    Tot FAST_CLUSTER_THRESHOLD markers een gewone MarkerCluster, daarboven een FastMarkerCluster.
+    Returnt (layer, bounds) of (None, None) als er geen markers met coördinaten zijn.
+    """
+    import folium
+    from folium.plugins import FastMarkerCluster, MarkerCluster
+
+    if "Latitude" not in markers.columns or "Longitude" not in markers.columns:
+        return None, None
+    lats = pd.to_numeric(markers["Latitude"], errors="coerce").to_numpy(dtype=float)
+    lons = pd.to_numeric(markers["Longitude"], errors="coerce").to_numpy(dtype=float)
+    keep = np.nan_to_num(lats) != 0
+    keep &= np.nan_to_num(lons) != 0
+    if not keep.any():
+        return None, None
+    names = markers["Naam"].astype(object)[keep] if "Naam" in markers.columns else ["Resultaat"] * int(keep.sum())
+    addresses = markers["Adres"].astype(object)[keep] if "Adres" in markers.columns else [""] * int(keep.sum())
+    points = [
+        (lat, lon, f"{html.escape(str(name))}<br>{html.escape(str(address) if pd.notna(address) else '')}")
+        for lat, lon, name, address in zip(lats[keep].tolist(), lons[keep].tolist(), names, addresses)
+    ]
+
+    if len(points) > FAST_CLUSTER_THRESHOLD:
+        layer = FastMarkerCluster([list(point) for point in points], callback=FAST_CLUSTER_CALLBACK)
+    else:
+        layer = MarkerCluster()
+        for lat, lon, popup in points:
+            folium.Marker([lat, lon], popup=popup).add_to(layer)
+
+    lats, lons = lats[keep], lons[keep]
+    return layer, [[float(lats.min()), float(lons.min())], [float(lats.max()), float(lons.max())]]
+
+def get_marker_layer(markers, fingerprint=None):
+    """Markerlaag uit de sessiecache; alleen opnieuw bouwen als de resultaten (vingerafdruk) veranderd zijn"""
+    fingerprint = fingerprint or results_fingerprint(markers)
+    layers = st.session_state.setdefault("marker_layers", {})
+    if fingerprint not in layers:
+        while len(layers) >= MARKER_LAYER_CACHE_SIZE:
+            layers.pop(next(iter(layers)))
+        layers[fingerprint] = build_marker_layer(markers)
+    return layers[fingerprint]
+
+def render_map_and_get_state(radius_m, results=None, force_render=False, key_suffix="default", fingerprint=None):
+    # folium en streamlit_folium pas laden als er echt een kaart getoond wordt
+    import folium
+    from streamlit_folium import st_folium
 
-def render_map_and_get_state(radius_m, results=None, force_render=False, key_suffix="default"):
     # Defaults
     if "map_center" not in st.session_state: st.session_state.map_center = [52.0, 5.0]
     if "map_zoom" not in st.session_state: st.session_state.map_zoom = 8
     if "clicked_location" not in st.session_state: st.session_state.clicked_location = None
-    if "last_results" not in st.session_state: st.session_state.last_results = []  # will hold list of dicts with lat/lon/name etc.
 
-    markers_to_show = results or st.session_state.last_results
+    # results: DataFrame met de resultaten; standaard die van de laatste zoekopdracht (ResultSet in session_state)
+    if results is None and st.session_state.get("results") is not None:
+        results, fingerprint = st.session_state.results.df, st.session_state.results.fingerprint
+    markers_to_show = results if results is not None and not results.empty else None
 
     # Als er geen reden is om de kaart te tonen, stop
-    if not force_render and not st.session_state.clicked_location and not markers_to_show:
+    if not force_render and not st.session_state.clicked_location and markers_to_show is None:
         return None
 
     # Map build
@@ -43,15 +105,10 @@ def render_map_and_get_state(radius_m, results=None, force_render=False, key_suf
             fill_opacity=0.15
         ).add_to(m)
 
-    # Resultaten
-    if markers_to_show:
-        cluster = MarkerCluster()
-        for result in markers_to_show:
-            lat, lon = result.get("Latitude"), result.get("Longitude")
-            if lat and lon:
-                popup = f"{result.get('Naam', 'Resultaat')}<br>{result.get('Adres', '')}"
-                folium.Marker([lat, lon], popup=popup).add_to(cluster)
-        m.add_child(cluster)
+    # Resultaten (gecachete laag)
+    layer, result_bounds = get_marker_layer(markers_to_show, fingerprint) if markers_to_show is not None else (None, None)
+    if layer is not None:
+        m.add_child(layer)
 
     # Auto-zoom
     bounds_to_fit = None
@@ -64,14 +121,8 @@ def render_map_and_get_state(radius_m, results=None, force_render=False, key_suf
             [lat - delta_lat, lon - delta_lon],
             [lat + delta_lat, lon + delta_lon]
         ]
-    elif markers_to_show:
-            lats = [r.get("Latitude") for r in markers_to_show if r.get("Latitude")]
-            lons = [r.get("Longitude") for r in markers_to_show if r.get("Longitude")]
-            if lats and lons:
-                bounds_to_fit = [
-                    [min(lats), min(lons)],
-                    [max(lats), max(lons)]
-                ]
+    elif result_bounds:
+        bounds_to_fit = result_bounds
 
     if bounds_to_fit:
         m.fit_bounds(bounds_to_fit)
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+# Geschatte kosten in USD per 1000 calls (legacy Places API, incl. de contactvelden bij Details)
+API_COST_PER_1000 = {"textsearch": 32.0, "nearbysearch": 32.0, "details": 20.0}
+BILLED_STATUSES = {"OK", "ZERO_RESULTS"}
+OTHER_STAGE = "overig"
+
+# (Metrics, naam van de huidige stap) of None als er niet gemeten wordt.
+# Een ContextVar zodat ook asyncio-taken de meting zien; worker threads krijgen hem mee via submit().
+_current = ContextVar("metrics", default=None)
+
+class Metrics:
+    """
+    Metingen per stap van een zoekopdracht (bijv. "places", "details", "emails", "sheets"):
+    wall time, aantal calls, bytes, fouten, statuscodes en geschatte API-kosten. Thread-safe.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds=0.0, calls=0, bytes=0, errors=0, status=None, cost=0.0):
+        with self.lock:
+            values = self.stages.get(stage)
+            if values is None:
+                values = self.stages[stage] = {"seconds": 0.0, "calls": 0, "bytes": 0, "errors": 0, "cost_usd": 0.0, "statuses": Counter()}
+            values["seconds"] += seconds
+            values["calls"] += calls
+            values["bytes"] += bytes
+            values["errors"] += errors
+            values["cost_usd"] += cost
+            if status is not None:
+                values["statuses"][str(status)] += 1
+
+    def snapshot(self):
+        """Kopie als gewone dict (JSON-serialiseerbaar), met een totaal over alle stappen"""
+        with self.lock:
+            stages = {name: {**values, "statuses": dict(values["statuses"])} for name, values in self.stages.items()}
+        total = {key: sum(values[key] for values in stages.values()) for key in ("calls", "bytes", "errors", "cost_usd")}
+        total["seconds"] = time.time() - self.started
+        return {"started": self.started, "stages": stages, "total": total}
+
+@contextmanager
+def collecting(metrics):
+    """Meet alles wat binnen dit blok (in deze thread en via submit() gestarte taken) gebeurt in metrics"""
+    token = _current.set((metrics, None))
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def stage(name):
+    """Tijd en calls binnen dit blok tellen voor stap name; doet niets als er niet gemeten wordt"""
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    token = _current.set((current[0], name))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        current[0].add(name, seconds=time.perf_counter() - start)
+
+def enabled():
+    return _current.get() is not None
+
+def record(calls=0, bytes=0, errors=0, status=None, cost=0.0):
+    """Tel een call (of fout) mee bij de huidige stap"""
+    current = _current.get()
+    if current is not None:
+        current[0].add(current[1] or OTHER_STAGE, calls=calls, bytes=bytes, errors=errors, status=status, cost=cost)
+
+def record_stage(name, seconds=0.0, calls=0, errors=0, status=None):
+    """Tel mee bij stap name in plaats van de huidige stap, bijv. wachttijd die binnen een andere stap valt"""
+    current = _current.get()
+    if current is not None:
+        current[0].add(name, seconds=seconds, calls=calls, errors=errors, status=status)
+
+def record_api_call(url, status, size):
+    """Een Places API-response: status is de HTTP-code of de API-status; kosten alleen voor gefactureerde statussen"""
+    if _current.get() is None:
+        return
+    endpoint = url.rstrip("/").split("/")[-2]
+    cost = API_COST_PER_1000.get(endpoint, 0.0) / 1000 if status in BILLED_STATUSES else 0.0
+    record(calls=1, bytes=size, errors=status not in BILLED_STATUSES, status=status, cost=cost)
+
+def submit(executor, fn, *args):
+    """executor.submit, maar de taak meet mee in de huidige meting (als die er is)"""
+    if _current.get() is None:
+        return executor.submit(fn, *args)
+    return executor.submit(copy_context().run, fn, *args)
+
+def to_json(snapshot):
+    return json.dumps(snapshot, indent=2)
+
+def to_prometheus(snapshot, prefix="webscraper"):
+    """Prometheus text exposition format, één serie per stap"""
+    lines = []
+    for metric, key, kind in [("stage_seconds", "seconds", "gauge"), ("stage_calls", "calls", "counter"),
+                              ("stage_bytes", "bytes", "counter"), ("stage_errors", "errors", "counter"),
+                              ("stage_cost_usd", "cost_usd", "counter")]:
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for name, values in snapshot["stages"].items():
+            lines.append(f'{prefix}_{metric}{{stage="{name}"}} {values[key]}')
+    lines.append(f"# TYPE {prefix}_stage_status counter")
+    for name, values in snapshot["stages"].items():
+        for status, count in values["statuses"].items():
+            lines.append(f'{prefix}_stage_status{{stage="{name}",status="{status}"}} {count}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,70 @@
+import logging
+import sys
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("webscraper")
+LOG_LEVELS = {"error": logging.ERROR, "warning": logging.WARNING, "success": logging.INFO, "info": logging.INFO, "caption": logging.INFO}
+
+# Per thread: een optionele sink die meldingen opvangt (bijv. een achtergrondjob) en de actieve voortgangsbalk
+_local = threading.local()
+
+def in_streamlit():
+    """
+    True als deze thread bij een Streamlit-sessie hoort (en niet bijv. in de CLI draait).
+    Is streamlit nog niet geïmporteerd, dan kan dat niet; zo laden de CLI en workers streamlit nooit.
+    """
+    if "streamlit" not in sys.modules:
+        return False
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    return get_script_run_ctx(suppress_warning=True) is not None
+
+def notify(level, message):
+    """
+    Toon een melding; level is een Streamlit-functie zoals "info", "success", "warning", "error" of "caption".
+    Binnen redirect_notifications gaat de melding naar de sink in plaats van naar Streamlit;
+    buiten Streamlit (zonder sink) naar de logging.
+    """
+    sink = getattr(_local, "sink", None)
+    if sink:
+        sink(level, message)
+    elif in_streamlit():
+        import streamlit as st
+
+        getattr(st, level)(message)
+    else:
+        logger.log(LOG_LEVELS.get(level, logging.INFO), message)
+
+def progress(fraction, text=None):
+    """Voortgang tonen (fraction tussen 0 en 1); progress(None) haalt de voortgangsbalk weer weg"""
+    sink = getattr(_local, "sink", None)
+    if sink:
+        sink("progress", (fraction, text))
+        return
+    if not in_streamlit():
+        if fraction is not None:
+            logger.debug("%s (%.0f%%)", text or "Voortgang", fraction * 100)
+        return
+
+    bar = getattr(_local, "progress_bar", None)
+    if fraction is None:
+        if bar is not None:
+            bar.empty()
+        _local.progress_bar = None
+    elif bar is None:
+        import streamlit as st
+
+        _local.progress_bar = st.progress(fraction, text=text)
+    else:
+        bar.progress(fraction, text=text)
+
+@contextmanager
+def redirect_notifications(sink):
+    """Stuur alle meldingen en voortgang in deze thread naar sink(level, message)"""
+    previous = getattr(_local, "sink", None)
+    _local.sink = sink
+    try:
+        yield
+    finally:
+        _local.sink = previous
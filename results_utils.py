@@ -0,0 +1,61 @@
+import hashlib
+import importlib.util
+import pandas as pd
+
+CATEGORY_MAX_RATIO = 0.5  # tekstkolommen met minder unieke waarden dan dit deel van de rijen worden categorical
+STRING_DTYPE = "string[pyarrow]" if importlib.util.find_spec("pyarrow") else "string"
+NUMERIC_DTYPES = {"Latitude": "float64", "Longitude": "float64", "Afstand (m)": "float32"}
+
+def compact_frame(df):
+    """
+    Compacte, getypte kopie van een resultaten-DataFrame:
+      - coördinaten en afstand als floats
+      - tekstkolommen met veel herhaling (Input, Status, Datum, ...) als categorical
+      - overige tekst als string-kolom (met pyarrow één aaneengesloten buffer i.p.v. een Python-object per cel)
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col in NUMERIC_DTYPES:
+            columns[col] = pd.to_numeric(values, errors="coerce").astype(NUMERIC_DTYPES[col])
+        elif values.dtype == object:
+            values = values.where(values.notna(), None).astype(STRING_DTYPE)
+            if len(values) and values.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(values):
+                values = values.astype("category")
+            columns[col] = values
+        else:
+            columns[col] = values
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+
+def results_fingerprint(df):
+    """Vingerafdruk van de volledige inhoud (kolommen en waarden) van een resultaten-DataFrame, gevectoriseerd"""
+    digest = hashlib.blake2b(digest_size=16)
+    if df is None or df.empty:
+        return digest.hexdigest()
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+class ResultSet:
+    """
+    Resultaten van een afgeronde zoekopdracht zoals ze in st.session_state staan: één compacte DataFrame
+    met de vingerafdruk en het geheugengebruik vooraf berekend. Kaart, tabel en export lezen allemaal deze df;
+    behandel hem als alleen-lezen.
+    """
+    def __init__(self, df):
+        self.df = compact_frame(df)
+        self.fingerprint = results_fingerprint(self.df)
+        self.memory_bytes = int(self.df.memory_usage(deep=True).sum())
+
+    def __len__(self):
+        return len(self.df)
+
+def session_memory_bytes(session_state):
+    """Schatting van het geheugen van de resultaten (en tussentijdse rijen) in één sessie"""
+    total = 0
+    for value in session_state.values():
+        if isinstance(value, ResultSet):
+            total += value.memory_bytes
+        elif isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(deep=True).sum())
+    return total
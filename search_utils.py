@@ -1,50 +1,291 @@
-import streamlit as st
-import requests
 import time
+import heapq
 import numpy as np
 import unidecode
 import re
-from urllib.parse import urlparse, urljoin
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from geopy.distance import geodesic
+import math
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 import pandas as pd
 from urllib.parse import urlparse
+from collections import Counter
+from functools import lru_cache
+from cache_utils import details_cache, result_cache, RESULTS_TTL
+from http_utils import TokenBucket, get_json
+from email_utils import EmailCrawl
+from notify_utils import notify, progress
+from config_utils import get_secret
+from metrics_utils import stage, submit, record_stage
+from budget_utils import SearchBudget, BudgetExceeded, call_cost, DEFAULT_USER
+
+_api_key = None  # pas bij het eerste gebruik opgehaald, zie get_api_key
+
+TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+DETAILS_FIELDS = "name,formatted_address,formatted_phone_number,website"
+MAX_PAGES = 3
+PAGE_SIZE = 20  # resultaten per pagina; maximaal MAX_PAGES * PAGE_SIZE = 60 per zoekopdracht
+PAGE_TOKEN_MIN_WAIT = 1.0  # seconden vóór de eerste poging met een nieuw page token (het wordt pas na ~1-2 s geldig)
+PAGE_TOKEN_RETRY = 0.25  # backoff na INVALID_REQUEST op een page token; verdubbelt tot PAGE_TOKEN_RETRY_MAX
+PAGE_TOKEN_RETRY_MAX = 0.5
+PAGE_TOKEN_TIMEOUT = 10  # seconden wachten op een geldig token voordat de vervolgpagina opgegeven wordt
+PAGING_STAGE = "paginering"  # meetstap met de wachttijd op page tokens en het aantal pagina's per zoekopdracht
+
+PLACES_QPS = 10  # maximaal aantal Places API-calls per seconde, gedeeld door alle zoekopdrachten
+DETAILS_MAX_WORKERS = 8  # maximaal aantal gelijktijdige Place Details calls
+
+# Grid search instellingen
+GRID_MAX_WORKERS = 8  # maximaal aantal gelijktijdige API-calls
+MAX_CELL_RADIUS_M = 2000  # startgrootte van een cel bij grote zoekgebieden
+MIN_CELL_RADIUS_M = 100  # kleiner dan dit wordt een verzadigde cel niet meer opgesplitst
+MAX_SUBDIVIDE_DEPTH = 1  # hoe vaak een verzadigde cel na elkaar opgesplitst mag worden (elke keer ~7× zoveel calls)
+CACHE_CELL_M = 100  # kaartlocaties binnen dezelfde cel van 100 m delen hun zoekresultaten in de cache
+EARTH_RADIUS_M = 6_371_008.8  # gemiddelde aardstraal; haversine wijkt hiermee < 0.5% af van geodesic (WGS84)
+
+# Schatting van het aantal calls vooraf (zie plan_search)
+EXPECTED_PAGES = 2  # verwachte pagina's per getypte Text Search (maximaal MAX_PAGES)
+EXPECTED_DENSITY_PER_KM2 = 40  # verwachte plaatsen per km² bij kaartzoekopdrachten; bepaalt pagina's en opsplitsen per cel
+MIN_PLANNED_DETAILS = PAGE_SIZE  # bij een krap budget eerst Details inperken, tot dit aantal; daarna pas het grid versoberen
+
+places_limiter = TokenBucket(PLACES_QPS)
+
+def get_api_key():
+    """Places API-sleutel; wordt bij het eerste gebruik opgehaald (env of st.secrets) en daarna door het hele proces gedeeld"""
+    global _api_key
+    if _api_key is None:
+        _api_key = get_secret("google", "places_api_key", env_var="GOOGLE_PLACES_API_KEY")
+    return _api_key
+
+def set_api_key(key):
+    """Een andere sleutel injecteren, bijv. voor een lokale stub"""
+    global _api_key
+    _api_key = key
+
+def cell_saturated(pages, last_page_size):
+    """
+    Loopt een zoekopdracht tegen het plafond van de API (MAX_PAGES volle pagina's, 60 resultaten)?
+    Alleen dan zijn er waarschijnlijk meer plaatsen en heeft opsplitsen zin.
+    """
+    return pages >= MAX_PAGES and last_page_size >= PAGE_SIZE
+
+class PageTokenNotReady(Exception):
+    """Het page token is (nog) niet geldig: de API antwoordt met INVALID_REQUEST"""
+
+class PlacesApiError(Exception):
+    """De Places API antwoordt (ook na de retries van get_json) met een andere status dan OK of ZERO_RESULTS"""
+
+def page_token_delay(attempt):
+    """Wachttijd vóór poging attempt (0 = eerste) om een vervolgpagina op te halen"""
+    if attempt == 0:
+        return PAGE_TOKEN_MIN_WAIT
+    return min(PAGE_TOKEN_RETRY * 2 ** (attempt - 1), PAGE_TOKEN_RETRY_MAX)
+
+def record_paging(stats, pages, token_wait, retries):
+    """Aantal pagina's en wachttijd op page tokens van één zoekopdracht of gridcel, in stats en in de metingen"""
+    stats[f"pages_{pages}"] += 1
+    stats["token_wait"] += token_wait
+    stats["token_retries"] += retries
+    record_stage(PAGING_STAGE, seconds=token_wait, calls=retries, status=f"{pages} pagina's")
+
+def paging_summary(stats):
+    """Korte samenvatting van record_paging voor een caption, of None als er niet gepagineerd is"""
+    counts = {pages: stats[f"pages_{pages}"] for pages in range(MAX_PAGES + 1) if stats[f"pages_{pages}"]}
+    if not counts:
+        return None
+    return (
+        "Pagina's per zoekopdracht: " + ", ".join(f"{n}× {pages}" for pages, n in counts.items())
+        + f"; {stats['token_wait']:.1f} s gewacht op page tokens ({stats['token_retries']} herhaalde calls)"
+    )
 
-API_KEY = st.secrets["google"]["places_api_key"]
-COMMON_PATHS = ["/contact", "/contact-us", "/contacten", "/about", "/over-ons", "/impressum", "/contact.html"]
-
-def google_places_search(query=None, location=None, radius=None):
+def fetch_places_page(query=None, location=None, radius=None, page_token=None, limiter=places_limiter, budget=None):
+    """
+    Haal één pagina resultaten op via Text Search (met query) of Nearby Search.
+    Returnt (results, next_page_token). Fouten (ook BudgetExceeded) worden doorgegeven aan de aanroeper;
+    een page token dat nog niet geldig is geeft PageTokenNotReady en elke andere status dan OK of ZERO_RESULTS
+    (bijv. OVER_QUERY_LIMIT, REQUEST_DENIED) PlacesApiError, zodat een mislukte cel niet als leeg telt.
+    """
+    if budget is not None:
+        budget.charge("textsearch" if query else "nearbysearch")
+    url = TEXT_SEARCH_URL if query else NEARBY_SEARCH_URL
+    params = {"key": get_api_key()}
+    if query:
+        params["query"] = query
+    if location:
+        params["location"] = f"{location[0]},{location[1]}"
+        params["radius"] = radius
+    if page_token:
+        params["pagetoken"] = page_token
+
+    data = get_json(url, params=params, limiter=limiter)
+    status = data.get("status")
+    if page_token and status == "INVALID_REQUEST":
+        raise PageTokenNotReady(data.get("error_message") or "page token nog niet geldig")
+    if status not in ("OK", "ZERO_RESULTS"):
+        raise PlacesApiError(f"Places search failed: {status} - {data.get('error_message')}")
+    return data.get("results", []), data.get("next_page_token")
+
+def google_places_search(query=None, location=None, radius=None, stats=None, budget=None, on_page=None, wait=time.sleep):
+    """
+    Alle pagina's (maximaal MAX_PAGES) van een Text Search of Nearby Search.
+    Een vervolgpagina wordt opgevraagd zodra zijn page token geldig is: eerst na PAGE_TOKEN_MIN_WAIT, daarna bij
+    INVALID_REQUEST opnieuw met een korte backoff (zie page_token_delay), hooguit PAGE_TOKEN_TIMEOUT seconden.
+    on_page(pagina) wordt direct na elke pagina aangeroepen, zodat bijv. de Details al kunnen starten;
+    wait(seconden) vult de wachttijd op een token (standaard time.sleep).
+    Pagina's, wachttijd en herhaalde calls komen in stats (zie record_paging) en in de metingen.
+    """
+    stats = Counter() if stats is None else stats
     results = []
-    next_page_token = None
-    pages_checked = 0
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json" if query else "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-
-    while True:
-        params = {"key": API_KEY}
-        if query:
-            params["query"] = query
-        if location:
-            params["location"] = f"{location[0]},{location[1]}"
-            params["radius"] = radius
-        if next_page_token:
-            params["page_token"] = next_page_token
+    page_token = None
+    pages = 0
+    token_wait = 0.0
+    retries = 0
 
-        try:
-            response = requests.get(url, params=params, timeout=30)
-            data = response.json()
-            results.extend(data.get("results", []))
-            next_page_token = data.get("nextPageToken")
-            pages_checked += 1
-            if not next_page_token or pages_checked >= 3:
+    try:
+        while True:
+            attempt, waited = 0, 0.0
+            while True:
+                if page_token:
+                    delay = page_token_delay(attempt)
+                    wait(delay)
+                    waited += delay
+                if attempt == 0:
+                    stats["places_calls"] += 1
+                try:
+                    # Een INVALID_REQUEST wordt niet gefactureerd, dus alleen de eerste poging afboeken
+                    batch, next_page_token = fetch_places_page(query, location, radius, page_token, budget=budget if attempt == 0 else None)
+                    break
+                except PageTokenNotReady:
+                    attempt += 1
+                    retries += 1
+                    if waited >= PAGE_TOKEN_TIMEOUT:
+                        raise
+            token_wait += waited
+            pages += 1
+            results.extend(batch)
+            if on_page and batch:
+                on_page(batch)
+            if not next_page_token or pages >= MAX_PAGES:
                 break
-            time.sleep(2)
-        except Exception as e:
-            st.warning(f"Fout bij API-call: {e}")
-            break
+            page_token = next_page_token
+    except Exception as e:
+        notify("warning", f"Fout bij API-call: {e}")
 
+    record_paging(stats, pages, token_wait, retries)
     return results
 
+def run_grid_search(query, cells, max_workers=GRID_MAX_WORKERS, qps=None, progress_callback=None, subdivide=None, on_results=None, cancel_event=None, result_filter=None, budget=None):
+    """
+    Voer de zoekopdrachten voor alle gridcellen gelijktijdig uit.
+      - cells: lijst van (lat, lon, radius_m); elke cel zoekt met zijn eigen radius.
+      - Maximaal `max_workers` calls tegelijk; `qps` geeft een eigen limiet (0 = geen), anders de gedeelde places_limiter.
+      - Vervolgpagina's worden ingepland zodra hun page token geldig is (bij INVALID_REQUEST opnieuw met een
+        korte backoff, zie page_token_delay), zonder andere cellen te blokkeren.
+      - Resultaten worden direct op place_id samengevoegd.
+      - subdivide(cel, verzadigd) mag extra cellen teruggeven die aan de wachtrij worden toegevoegd.
+      - result_filter(pagina) geeft de resultaten van een pagina terug die bewaard moeten worden (bijv. binnen de radius).
+      - budget (een SearchBudget): elke call wordt afgeboekt; als het budget op is mislukken de resterende cellen.
+    progress_callback(klaar, totaal, latency) wordt na elke afgeronde cel aangeroepen en on_results(nieuwe_resultaten)
+    na elke pagina met nieuwe place_ids (beide in de aanroepende thread).
+    Als cancel_event gezet wordt, worden geen nieuwe calls meer gestart en wachtende calls geannuleerd.
+    Returnt (results, stats) met stats: aantal cellen en calls, latency per cel, foutmeldingen
+    en onder "paging" de pagina's per cel en de wachttijd op page tokens (zie record_paging).
+    """
+    limiter = places_limiter if qps is None else TokenBucket(qps)
+    merged = {}
+    cells = list(cells)
+    stats = {"points": len(cells), "calls": 0, "latencies": [], "errors": [], "paging": Counter()}
+
+    def fetch(cell, page_token, charge):
+        lat, lon, radius = cell
+        return fetch_places_page(query, (lat, lon), radius, page_token, limiter=limiter, budget=budget if charge else None)
+
+    # Wachtrij met (klaar_om, volgnummer, cel-index, page_token, pagina's, starttijd, poging, wachttijd, herhaald)
+    scheduled = [(0, i, i, None, 0, None, 0, 0.0, 0) for i in range(len(cells))]
+    heapq.heapify(scheduled)
+    seq = len(cells)
+    cells_done = 0
+
+    def finish_cell(i, started, saturated, pages, token_wait, retries):
+        nonlocal cells_done, seq
+        cells_done += 1
+        latency = time.monotonic() - started
+        stats["latencies"].append(latency)
+        record_paging(stats["paging"], pages, token_wait, retries)
+        if subdivide:
+            for child in subdivide(cells[i], saturated):
+                cells.append(child)
+                seq += 1
+                heapq.heappush(scheduled, (0, seq, len(cells) - 1, None, 0, None, 0, 0.0, 0))
+            stats["points"] = len(cells)
+        if progress_callback:
+            progress_callback(cells_done, len(cells), latency)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    running = {}
+    try:
+        while scheduled or running:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            now = time.monotonic()
+            while scheduled and scheduled[0][0] <= now and len(running) < max_workers:
+                _, _, i, page_token, pages, started, attempt, waited, retries = heapq.heappop(scheduled)
+                # Een INVALID_REQUEST wordt niet gefactureerd, dus alleen de eerste poging afboeken
+                future = submit(executor, fetch, cells[i], page_token, attempt == 0)
+                running[future] = (i, page_token, pages, started or now, attempt, waited, retries)
+
+            if not running:
+                time.sleep(min(max(scheduled[0][0] - now, 0), 0.5))
+                continue
+
+            # Alleen op de wachtrij letten als er een worker vrij is; anders wachten tot een call klaar is (geen busy-wait)
+            timeout = max(scheduled[0][0] - now, 0) if scheduled and len(running) < max_workers else None
+            if cancel_event is not None:
+                timeout = min(timeout, 0.5) if timeout is not None else 0.5
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, page_token, pages, started, attempt, waited, retries = running.pop(future)
+                try:
+                    batch, next_page_token = future.result()
+                except PageTokenNotReady as e:
+                    if sum(page_token_delay(a) for a in range(attempt + 1)) >= PAGE_TOKEN_TIMEOUT:
+                        stats["errors"].append(str(e))
+                        finish_cell(i, started, False, pages, waited, retries + 1)
+                        continue
+                    # Token nog niet geldig: dezelfde pagina na een korte backoff opnieuw proberen
+                    seq += 1
+                    delay = page_token_delay(attempt + 1)
+                    heapq.heappush(scheduled, (time.monotonic() + delay, seq, i, page_token, pages, started, attempt + 1, waited + delay, retries + 1))
+                    continue
+                except Exception as e:
+                    stats["calls"] += 1
+                    stats["errors"].append(str(e))
+                    finish_cell(i, started, False, pages, waited, retries)
+                    continue
+                stats["calls"] += 1
+
+                new_results = []
+                for result in (result_filter(batch) if result_filter else batch):
+                    pid = result.get("place_id")
+                    if pid and pid not in merged:
+                        merged[pid] = result
+                        new_results.append(result)
+                if on_results and new_results:
+                    on_results(new_results)
+
+                pages += 1
+                if next_page_token and pages < MAX_PAGES:
+                    seq += 1
+                    delay = page_token_delay(0)
+                    heapq.heappush(scheduled, (time.monotonic() + delay, seq, i, next_page_token, pages, started, 0, waited + delay, retries))
+                else:
+                    finish_cell(i, started, cell_saturated(pages, len(batch)), pages, waited, retries)
+    finally:
+        # Bij annuleren niet wachten op calls die al onderweg zijn
+        executor.shutdown(wait=not running, cancel_futures=True)
+
+    return list(merged.values()), stats
+
 def generate_grid(center_lat, center_lon, radius_m, step_m=500):
     """
     Genereer een raster/grid rond het centrum
@@ -64,169 +305,627 @@ def generate_grid(center_lat, center_lon, radius_m, step_m=500):
 
     return [(lat, lon) for lat in lats for lon in lons]
 
-def get_place_details(place_id):
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
+def plan_hex_grid(center_lat, center_lon, radius_m, cell_radius_m):
+    """
+    Plan hexagonaal gestapelde cellen die samen de zoekcirkel afdekken.
+    Elke cel is een zeshoek met omgeschreven straal cell_radius_m; een zoekopdracht met die radius dekt de hele cel.
+    Alleen cellen die de zoekcirkel raken worden meegenomen.
+    Returnt een lijst van (lat, lon, cell_radius_m).
+    """
+    if cell_radius_m >= radius_m:
+        # Eén zoekopdracht vanuit het centrum dekt de hele cirkel al
+        return [(center_lat, center_lon, radius_m)]
+
+    col_step = np.sqrt(3) * cell_radius_m
+    row_step = 1.5 * cell_radius_m
+    reach = (radius_m + cell_radius_m) * (1 - 1e-9)  # cellen die de cirkel alleen raken niet meenemen
+    n_rows = int(reach // row_step) + 1
+    n_cols = int(reach // col_step) + 1
+
+    m_per_deg_lon = 111_000 * np.cos(np.radians(center_lat))
+    cells = []
+    for row in range(-n_rows, n_rows + 1):
+        dy = row * row_step
+        offset = col_step / 2 if row % 2 else 0
+        for col in range(-n_cols - 1, n_cols + 1):
+            dx = col * col_step + offset
+            if np.hypot(dx, dy) < reach:
+                cells.append((center_lat + dy / 111_000, center_lon + dx / m_per_deg_lon, cell_radius_m))
+    return cells
+
+def hex_subdivider(center_lat, center_lon, radius_m, min_cell_radius_m=MIN_CELL_RADIUS_M, max_depth=MAX_SUBDIVIDE_DEPTH):
+    """
+    Maak een subdivide-functie voor run_grid_search.
+    Een verzadigde cel wordt opgesplitst in (maximaal) 7 cellen met de halve straal, hooguit max_depth keer
+    na elkaar (de geplande cellen hebben diepte 0); cellen die buiten de zoekcirkel vallen worden overgeslagen.
+    """
+    m_per_deg_lon = 111_000 * np.cos(np.radians(center_lat))
+    depths = {}  # cel -> diepte, alleen voor cellen die door opsplitsen zijn ontstaan
+
+    def subdivide(cell, saturated):
+        lat, lon, cell_radius_m = cell
+        child_radius_m = cell_radius_m / 2
+        depth = depths.get(cell, 0) + 1
+        if not saturated or child_radius_m < min_cell_radius_m or depth > max_depth:
+            return []
+        children = [
+            child for child in plan_hex_grid(lat, lon, cell_radius_m, child_radius_m)
+            if np.hypot((child[0] - center_lat) * 111_000, (child[1] - center_lon) * m_per_deg_lon) < radius_m + child_radius_m
+        ]
+        depths.update(dict.fromkeys(children, depth))
+        return children
+
+    return subdivide
+
+def estimate_cell(cell_radius_m, max_depth=MAX_SUBDIVIDE_DEPTH, density=EXPECTED_DENSITY_PER_KM2):
+    """
+    Verwacht aantal calls en gevonden plaatsen van één gridcel bij een gelijkmatige dichtheid, met dezelfde regel
+    als hex_subdivider: alleen een verzadigde cel (zie cell_saturated) wordt opgesplitst in cellen met de halve straal,
+    hooguit max_depth keer. Een cel die niet opgesplitst wordt levert hooguit MAX_PAGES * PAGE_SIZE plaatsen.
+    Returnt (calls, plaatsen).
+    """
+    expected = density * math.pi * (cell_radius_m / 1000) ** 2
+    pages = min(max(math.ceil(expected / PAGE_SIZE), 1), MAX_PAGES)
+    last_page_size = min(expected - (pages - 1) * PAGE_SIZE, PAGE_SIZE)
+    if max_depth <= 0 or not cell_saturated(pages, last_page_size) or cell_radius_m / 2 < MIN_CELL_RADIUS_M:
+        return pages, min(expected, MAX_PAGES * PAGE_SIZE)
+    children = len(plan_hex_grid(0.0, 0.0, cell_radius_m, cell_radius_m / 2))
+    child_calls, child_found = estimate_cell(cell_radius_m / 2, max_depth - 1, density)
+    return pages + children * child_calls, min(expected, children * child_found)
+
+def estimate_search(typed, radius_m=None, cell_radius_m=MAX_CELL_RADIUS_M, max_depth=MAX_SUBDIVIDE_DEPTH, max_details=None):
+    """
+    Schat het aantal Places-calls van een zoekopdracht uit het geplande grid, de paginering (en het opsplitsen
+    van verzadigde cellen tot max_depth) en het verwachte aantal Details (minus wat de Details-cache naar
+    verwachting beantwoordt). Beide soorten zoekopdrachten gebruiken Text Search: het grid zoekt met de
+    categorie als query per cel. Returnt ({soort: calls}, geschatte kosten in USD).
+    """
+    if typed:
+        searches = EXPECTED_PAGES
+        found = EXPECTED_PAGES * PAGE_SIZE
+    else:
+        # Het aantal cellen hangt alleen af van de radius en celgrootte, niet van de locatie
+        cell_radius_m = min(radius_m, cell_radius_m)
+        n_cells = len(plan_hex_grid(0.0, 0.0, radius_m, cell_radius_m))
+        cell_calls, cell_found = estimate_cell(cell_radius_m, max_depth)
+        searches = n_cells * cell_calls
+        found = min(EXPECTED_DENSITY_PER_KM2 * math.pi * (radius_m / 1000) ** 2, n_cells * cell_found)
+    details = found * (1 - details_cache.stats()["hit_rate"])
+    if max_details is not None:
+        details = min(details, max_details)
+    calls = {"textsearch": math.ceil(searches), "details": math.ceil(details)}
+    return calls, sum(n * call_cost(k) for k, n in calls.items())
+
+class SearchPlan:
+    """
+    Uitvoeringsplan van een zoekopdracht binnen het beschikbare budget: celgrootte van het grid, hoe vaak
+    verzadigde cellen opgesplitst mogen worden, maximaal aantal Details, wel/geen e-mailcrawl, de geschatte
+    calls en kosten, de toegepaste versoberingen en het SearchBudget dat tijdens de zoekopdracht afgeboekt wordt.
+    """
+    def __init__(self, budget, available, cell_radius_m, subdivide_depth, max_details, crawl_emails, calls, cost, degradations):
+        self.budget = budget
+        self.available = available
+        self.cell_radius_m = cell_radius_m
+        self.subdivide_depth = subdivide_depth
+        self.max_details = max_details
+        self.crawl_emails = crawl_emails
+        self.calls = calls
+        self.cost = cost
+        self.degradations = degradations
+
+    @property
+    def allowed(self):
+        return self.cost <= self.available
+
+    def describe(self):
+        calls = ", ".join(f"{n} {kind}" for kind, n in self.calls.items())
+        return f"Geschat: {calls} (ca. ${self.cost:.2f}; nog ${self.available:.2f} budget beschikbaar)"
+
+def plan_search(search_option, radius_m, user=DEFAULT_USER, budget=None):
+    """
+    Plan een zoekopdracht binnen het budget (zie budget_utils): het minst versoberde plan dat past.
+    Eerst gaan de goedkope hefbomen: Details alleen voor de eerste N resultaten (dichtstbijzijnde of meest
+    prominente), zolang dat er minstens MIN_PLANNED_DETAILS zijn. Pas daarna minder vaak opsplitsen, tot niet
+    opsplitsen, en dan een grover grid; op de laatste stap mogen de Details tot 0 zakken (dan ook geen e-mailcrawl).
+    Returnt een SearchPlan; plan.allowed is False als zelfs de zoekcalls zelf niet meer passen.
+    """
+    typed = search_option == "Categorie en plaats typen"
+    budget = budget or SearchBudget(user)
+    available = budget.available()
+
+    # Grid-varianten van volledig naar sterkst versoberd: (celgrootte, opsplitsdiepte)
+    if typed:
+        steps = [(MAX_CELL_RADIUS_M, 0)]
+    else:
+        cell_radius_m = min(radius_m, MAX_CELL_RADIUS_M)
+        steps = [(cell_radius_m, depth) for depth in range(MAX_SUBDIVIDE_DEPTH, -1, -1)]
+        while cell_radius_m < radius_m:
+            cell_radius_m = min(cell_radius_m * 2, radius_m)
+            steps.append((cell_radius_m, 0))
+
+    for step, (cell_radius_m, depth) in enumerate(steps):
+        max_details = None
+        calls, cost = estimate_search(typed, radius_m, cell_radius_m, depth)
+        if cost <= available:
+            break
+        places_cost = cost - calls["details"] * call_cost("details")
+        max_details = max(int((available - places_cost) / call_cost("details")), 0)
+        if max_details >= MIN_PLANNED_DETAILS or step == len(steps) - 1:
+            calls, cost = estimate_search(typed, radius_m, cell_radius_m, depth, max_details)
+            break
+
+    degradations = []
+    if not typed and depth < MAX_SUBDIVIDE_DEPTH:
+        degradations.append(
+            "verzadigde gridcellen worden niet opgesplitst" if depth == 0
+            else f"verzadigde gridcellen worden hooguit {depth}× opgesplitst"
+        )
+    if not typed and cell_radius_m > min(radius_m, MAX_CELL_RADIUS_M):
+        degradations.append(f"grover grid (cellen van {cell_radius_m:.0f} m)")
+    if max_details is not None:
+        degradations.append(f"Place Details alleen voor de eerste {max_details} resultaten")
+    crawl_emails = max_details != 0
+    if not crawl_emails:
+        degradations.append("geen e-mailcrawl (zonder Details geen websites)")
+    return SearchPlan(budget, available, cell_radius_m, depth, max_details, crawl_emails, calls, cost, degradations)
+
+def fetch_place_details(place_id, fields=DETAILS_FIELDS, use_cache=True, budget=None):
+    """
+    Haal Place Details op; eerder opgehaalde (en nog verse) details komen uit de lokale cache.
+    Met budget wordt een call eerst afgeboekt (niet bij een cache hit).
+    Returnt (result, foutmelding of None). Toont zelf niets, dus veilig vanuit worker-threads.
+    """
+    if use_cache:
+        cached = details_cache.get(place_id, fields)
+        if cached is not None:
+            return cached, None
+
     params = {
         "place_id": place_id,
-        "fields": "name,formatted_address,formatted_phone_number,website",
-        "key": API_KEY
+        "fields": fields,
+        "key": get_api_key()
     }
     try:
-        response = requests.get(url, params=params, timeout=30)
-        data = response.json()
+        if budget is not None:
+            budget.charge("details")
+        data = get_json(DETAILS_URL, params=params, limiter=places_limiter)
         if data.get("status") != "OK":
-            st.warning(f"Place Details failed: {data.get('status')} - {data.get('error_message')}")
-        return data.get("result", {})
+            return data.get("result", {}), f"Place Details failed: {data.get('status')} - {data.get('error_message')}"
+        result = data.get("result", {})
+        details_cache.set(place_id, fields, result)
+        return result, None
+    except BudgetExceeded as e:
+        return {}, f"Place Details overgeslagen: {e}"
     except Exception as e:
-        st.warning(f"Fout bij ophalen gegevens: {e}")
-        return {}
+        return {}, f"Fout bij ophalen gegevens: {e}"
+
+def get_place_details(place_id, fields=DETAILS_FIELDS, use_cache=True):
+    result, error = fetch_place_details(place_id, fields, use_cache)
+    if error:
+        notify("warning", error)
+    return result
+
+class DetailsBatch:
+    """
+    Place Details voor een groeiende lijst place_ids, parallel met een begrensde worker pool.
+    add() raadpleegt eerst de cache (in deze thread) en start de overige calls direct, zodat bijv. de eerste pagina
+    al Details ophaalt terwijl de volgende nog komt. poll(), wait_for() en finish() verwerken afgeronde calls
+    en roepen on_result(index, result) aan in de aanroepende thread.
+    """
+    def __init__(self, fields=DETAILS_FIELDS, max_workers=DETAILS_MAX_WORKERS, stats=None, on_result=None, cancel_event=None, budget=None):
+        self.fields = fields
+        self.stats = stats
+        self.on_result = on_result
+        self.cancel_event = cancel_event
+        self.budget = budget
+        self.results = []
+        self.errors = []
+        self.futures = {}
+        self.pending = set()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def add(self, place_ids):
+        """Details voor deze place_ids erbij (een lege place_id krijgt een leeg resultaat)"""
+        for pid in place_ids:
+            i = len(self.results)
+            cached = details_cache.get(pid, self.fields) if pid else {}
+            self.results.append({} if cached is None else cached)
+            if cached is None:
+                future = submit(self.executor, fetch_place_details, pid, self.fields, False, self.budget)
+                self.futures[future] = i
+                self.pending.add(future)
+                if self.stats is not None:
+                    self.stats["details_calls"] += 1
+            else:
+                if pid and self.stats is not None:
+                    self.stats["details_cached"] += 1
+                if self.on_result:
+                    self.on_result(i, cached)
+
+    def poll(self, timeout=0):
+        """Verwerk de calls die (binnen timeout seconden) klaar zijn"""
+        done, self.pending = wait(self.pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            i = self.futures.pop(future)
+            self.results[i], error = future.result()
+            if error:
+                self.errors.append(error)
+            if self.on_result:
+                self.on_result(i, self.results[i])
+
+    def wait_for(self, seconds):
+        """Wacht seconds seconden en verwerk intussen afgeronde calls; bruikbaar als wait van google_places_search"""
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not self.pending or self.cancelled():
+                time.sleep(remaining)
+                return
+            self.poll(remaining)
+
+    def finish(self):
+        """Wacht op de resterende calls; returnt (results, errors) in de volgorde waarin de place_ids toegevoegd zijn"""
+        try:
+            while self.pending and not self.cancelled():
+                self.poll(0.5)
+        finally:
+            self.executor.shutdown(wait=not self.cancelled(), cancel_futures=True)
+            details_cache.flush()  # last_used van de cache hits in één keer wegschrijven
+        return self.results, self.errors
+
+def get_place_details_batch(place_ids, fields=DETAILS_FIELDS, max_workers=DETAILS_MAX_WORKERS, stats=None, on_result=None, cancel_event=None, budget=None):
+    """
+    Haal Place Details parallel op met een begrensde worker pool; de cache wordt eerst (in deze thread) geraadpleegd.
+    Returnt (results, errors); results staan in dezelfde volgorde als place_ids.
+    Als stats meegegeven is worden details_cached en details_calls opgehoogd.
+    on_result(index, result) wordt in de aanroepende thread aangeroepen zodra een resultaat binnen is.
+    Als cancel_event gezet wordt, worden de wachtende calls geannuleerd; met budget wordt elke call afgeboekt.
+    """
+    batch = DetailsBatch(fields, max_workers, stats, on_result, cancel_event, budget)
+    try:
+        batch.add(place_ids)
+    finally:
+        results = batch.finish()
+    return results
+
+@lru_cache(maxsize=4096)
+def normalise_address(text):
+    """Kleine letters en zonder accenten; unidecode alleen als de tekst niet al ASCII is"""
+    text = text.lower()
+    return text if text.isascii() else unidecode.unidecode(text)
+
+class PlaceMatcher:
+    """
+    Vooraf gecompileerde check of een plaatsnaam in een adres voorkomt:
+    exacte woordmatch, of de plaatsnaam gevolgd door een komma.
+    """
+    def __init__(self, place):
+        self.place_norm = normalise_address(place) if place else ""
+        patterns = [re.escape(self.place_norm) + ","]
+        if re.fullmatch(r"[a-zA-Z]+", self.place_norm):
+            patterns.append(rf"(?<![a-zA-Z]){re.escape(self.place_norm)}(?![a-zA-Z])")
+        self.pattern = re.compile("|".join(patterns))
+
+    def matches(self, address):
+        if not address or not self.place_norm:
+            return False
+        return self.pattern.search(normalise_address(address)) is not None
+
+@lru_cache(maxsize=256)
+def place_matcher(place):
+    return PlaceMatcher(place)
 
 def address_matches_place(address, place):
     """Check of de ingevoerde plaatsnaam in het adres voorkomt"""
     if not address or not place:
         return False
+    return place_matcher(place).matches(address)
 
-    address_norm = unidecode.unidecode(address.lower())
-    place_norm = unidecode.unidecode(place.lower())
+def describe_search(search_option, category_input, place_input, clicked_location, radius_m):
+    """Returnt (input_text, filename) voor een zoekopdracht"""
+    if search_option == "Categorie en plaats typen":
+        input_text = f"Getypt: {category_input} in {place_input}"
+        filename = f"{category_input}_{place_input}.xlsx".replace(" ", "_")
+    else:
+        lat, lon = clicked_location
+        input_text = f"Kaart: {category_input} in {lat:.5f}, {lon:.5f} (radius {radius_m} m)"
+        filename = f"{category_input}_{f'{lat}_{lon}'}.xlsx".replace(" ", "_")
+    return input_text, filename
 
-    # Splits aders in woorden
-    tokens = re.findall(r"[a-zA-Z]+", address_norm)
+def normalise_text(text):
+    return " ".join(unidecode.unidecode(str(text or "")).lower().split())
 
-    # Exacte woordmatch of plaatsnaam gevolgd door komma
-    if place_norm in tokens or f"{place_norm}," in address_norm:
-        return True
+def search_cache_key(search_option, category_input, place_input, clicked_location, radius_m):
+    """
+    Cache-key voor een zoekopdracht: genormaliseerde tekst (hoofdletters, accenten en spaties maken niet uit)
+    en bij kaartzoekopdrachten de locatie afgerond op een cel van CACHE_CELL_M meter.
+    """
+    category = normalise_text(category_input)
+    if search_option == "Categorie en plaats typen":
+        return f"getypt|{category}|{normalise_text(place_input)}"
+    lat, lon = clicked_location
+    cell_lat = round(lat * 111_000 / CACHE_CELL_M)
+    cell_lon = round(lon * 111_000 * np.cos(np.radians(lat)) / CACHE_CELL_M)
+    return f"kaart|{category}|{cell_lat}|{cell_lon}|{radius_m}"
 
-    return False
+def run_search_cached(search_option, category_input, place_input, clicked_location, radius_m, force_refresh=False, max_age=RESULTS_TTL, on_rows=None, cancel_event=None, stats=None, user=DEFAULT_USER):
+    """
+    run_search met een cache die door alle sessies gedeeld wordt.
+    Een (bijna) identieke zoekopdracht die jonger is dan max_age komt direct uit de cache,
+    tenzij force_refresh aan staat. Returnt hetzelfde als run_search; API-calls worden in stats geteld.
+    Anders wordt de zoekopdracht eerst binnen het budget van user gepland (zie plan_search);
+    past hij helemaal niet meer, dan volgt BudgetExceeded. Versoberde resultaten komen niet in de cache.
+    """
+    stats = Counter() if stats is None else stats
+    if search_option != "Categorie en plaats typen" and not clicked_location:
+        return run_search(search_option, category_input, place_input, clicked_location, radius_m, stats=stats, on_rows=on_rows, cancel_event=cancel_event)
+
+    key = search_cache_key(search_option, category_input, place_input, clicked_location, radius_m)
+    input_text, filename = describe_search(search_option, category_input, place_input, clicked_location, radius_m)
+
+    cached = None if force_refresh else result_cache.get(key, max_age)
+    if cached is not None:
+        df, api_calls, age = cached
+        df = df.copy()
+        df["Input"] = input_text
+        notify("success", f"Resultaten uit de cache ({age / 60:.0f} min oud): {api_calls} API-calls bespaard.")
+    else:
+        plan = plan_search(search_option, radius_m, user)
+        notify("caption", plan.describe())
+        if not plan.allowed:
+            raise BudgetExceeded(f"Onvoldoende budget voor deze zoekopdracht. {plan.describe()}")
+        if plan.degradations:
+            notify("warning", "Het budget is krap, daarom: " + "; ".join(plan.degradations) + ".")
+        df, input_text, filename = run_search(
+            search_option, category_input, place_input, clicked_location, radius_m,
+            stats=stats, on_rows=on_rows, cancel_event=cancel_event, plan=plan
+        )
+        notify("caption", f"Places API: {sum(plan.budget.calls.values())} calls afgeboekt, ca. ${plan.budget.spent:.2f}")
+        if df is not None and not df.empty and not plan.degradations and not plan.budget.exhausted:
+            result_cache.set(key, df, stats["places_calls"] + stats["details_calls"])
+
+    cache_stats = result_cache.stats()
+    notify(
+        "caption",
+        f"Zoekcache: hit rate {cache_stats['hit_rate']:.0%} ({cache_stats['hits']} van "
+        f"{cache_stats['hits'] + cache_stats['misses']}), in totaal {cache_stats['calls_saved']} API-calls bespaard"
+    )
+    return df, input_text, filename
 
-def find_email_on_url(url):
-    try:
-        response = requests.get(url, timeout=6, headers={"User-Agent": "Mozilla/5.0"})
-        if response.status_code != 200:
-            return None
-
-        # mailto first
-        m = re.search(r'href=["\']mailto:([^"\']+)["\']', response.text, flags=re.I)
-        if m:
-            return m.group(1).split("?")[0]
-
-        # Regex fallback
-        emails = re.findall(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}", response.text)
-        return emails[0] if emails else None
-    except Exception:
-        return None
+def distances_m(center, lats, lons):
+    """Grootcirkelafstand (haversine) in meters van center naar alle punten tegelijk"""
+    lat0, lon0 = np.radians(center[0]), np.radians(center[1])
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    a = np.sin((lats - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lats) * np.sin((lons - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
 
-def find_email_for_domain(base_url):
-    parsed = urlparse(base_url)
-    base = f"{parsed.scheme}://{parsed.netloc}/"
+def filter_within_radius(results, center, radius_m):
+    """
+    Houd alleen de resultaten binnen radius_m van center over (resultaten zonder locatie vallen af).
+    Returnt (results, afstanden in meters) in de oorspronkelijke volgorde.
+    """
+    if not results:
+        return [], np.empty(0)
+    locs = [result.get("geometry", {}).get("location", {}) for result in results]
+    lats = np.array([loc.get("lat", np.nan) for loc in locs], dtype=float)
+    lons = np.array([loc.get("lng", np.nan) for loc in locs], dtype=float)
+    distances = distances_m(center, lats, lons)
+    keep = distances <= radius_m  # NaN (geen locatie) is nooit <= radius
+    return [result for result, k in zip(results, keep) if k], distances[keep]
+
+def build_row(result, details, input_text, distance_m=None):
+    """Eén resultaatrij uit een zoekresultaat en (eventueel lege) Place Details; distance_m alleen bij kaartzoekopdrachten"""
+    loc = result.get("geometry", {}).get("location", {})
+    row = {
+        "Input": input_text,
+        "Naam": details.get("name") or result.get("name") or None,
+        "Adres": details.get("formatted_address") or result.get("formatted_address") or None,
+        "Latitude": loc.get("lat") or None,
+        "Longitude": loc.get("lng") or None,
+        "Telefoon": details.get("formatted_phone_number") or None,
+        "Website": details.get("website") or None,
+        "E-mail": None,  # placeholder
+        "Status": "Nieuw",  # default
+        "Datum": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    }
+    if distance_m is not None:
+        row["Afstand (m)"] = round(float(distance_m))
+    return row
 
-    # Try common paths first
-    for path in COMMON_PATHS:
-        email = find_email_on_url(urljoin(base, path))
-        if email:
-            return email
+def run_search(search_option, category_input, place_input, clicked_location, radius_m, stats=None, on_rows=None, cancel_event=None, plan=None):
+    """
+    Voer een zoekopdracht uit en returnt (df, input_text, filename).
+      - stats (een Counter): de API-calls per soort worden hierin opgeteld.
+      - on_rows(rows): tussentijdse resultaten als lijst van (place_id, rij), zodra gridpunten, Details
+        en e-mails binnenkomen; een rij kan ook een deel van de kolommen bevatten (bijv. alleen "E-mail").
+      - cancel_event: als die gezet wordt stopt de zoekopdracht en returnt (None, input_text, filename).
+      - plan (een SearchPlan, zie plan_search): celgrootte, opsplitsen, maximaal aantal Details en e-mailcrawl,
+        en het budget waarop elke Places-call afgeboekt wordt. Zonder plan geen budget.
+    """
+    notify("info", f"Zoeken... Even geduld alsjeblieft :)")
+    stats = Counter() if stats is None else stats
+    typed = search_option == "Categorie en plaats typen"
+    budget = plan.budget if plan else None
+    max_details = plan.max_details if plan else None
 
-    # Try homepage
-    return find_email_on_url(base)
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
 
-def fetch_emails(urls, max_workers=8):
-    """Fetch emails in parallel"""
-    domain_map = {}
-    for url in urls:
-        try:
-            parsed = urlparse(url)
-            domain = parsed.netloc
-            if domain:
-                domain_map.setdefault(domain, url)
-        except Exception:
-            continue
+    def emit(rows):
+        if on_rows and rows:
+            on_rows(rows)
 
-    results = {}
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(find_email_for_domain, url): domain for domain, url in domain_map.items()}
-        for future in as_completed(futures):
-            domain = futures[future]
-            try:
-                results[domain] = future.result()
-            except Exception:
-                results[domain] = None
-    return results
+    if not typed and not clicked_location:
+        notify("warning", "Klik eerst op de kaart om een locatie te selecteren!")
+        return None, None, None
+    input_text, filename = describe_search(search_option, category_input, place_input, clicked_location, radius_m)
 
-def run_search(search_option, category_input, place_input, clicked_location, radius_m):
-    st.info(f"Zoeken... Even geduld alsjeblieft :)")
-    data_list = []
-    seen_place_ids = set()
+    # E-mails zoeken zodra de Details van een plaats de website opleveren, parallel aan de rest van de zoekopdracht
+    domain_keys = {}
 
-    if search_option == "Categorie en plaats typen":
+    def on_email(domain, email):
+        if email:
+            emit([(key, {"E-mail": email}) for key in domain_keys.get(domain, [])])
+
+    crawl = None
+    if not plan or plan.crawl_emails:
+        with stage("emails"):
+            crawl = EmailCrawl(on_result=on_email, cancel_event=cancel_event)
+
+    # Place Details parallel ophalen; elke plaats verschijnt (of wordt aangevuld) zodra de details binnen zijn.
+    # Bij een krap budget alleen Details voor de eerste max_details resultaten; de rest houdt naam, adres en locatie.
+    results, distances = [], []
+    details_done = 0
+    searching = not typed  # tijdens het grid toont de voortgangsbalk de gridpunten
+
+    def has_details(i):
+        return max_details is None or i < max_details
+
+    def on_details(i, details):
+        nonlocal details_done
+        details_done += 1
+        if not searching:
+            progress(details_done / len(results), f"Place Details: {details_done}/{len(results)}")
+        result = results[i]
+        if typed and has_details(i) and not matcher.matches(details.get("formatted_address", "")):
+            return
+        if result.get("place_id"):
+            emit([(result["place_id"], build_row(result, details, input_text, distances[i]))])
+        website = details.get("website")
+        if crawl and website:
+            domain_keys.setdefault(urlparse(website).netloc, []).append(result.get("place_id"))
+            crawl.add([website])
+            crawl.poll()
+
+    details_batch = DetailsBatch(stats=stats, on_result=on_details, cancel_event=cancel_event, budget=budget)
+
+    def request_details(batch, batch_distances=None):
+        start = len(results)
+        results.extend(batch)
+        distances.extend([None] * len(batch) if batch_distances is None else batch_distances)
+        with stage("details"):
+            details_batch.add([result.get("place_id") if has_details(start + k) else None for k, result in enumerate(batch)])
+
+    if typed:
         query = f"{category_input} in {place_input}"
-        results = google_places_search(query=query)
-        input_text = f"Getypt: {category_input} in {place_input}"
-        filename = f"{category_input}_{place_input}.xlsx".replace(" ", "_")
+        matcher = place_matcher(place_input)
+        found = 0
+
+        def on_page(batch):
+            # Text Search geeft al een adres: plaatsen buiten de gezochte plaats vallen af vóór de (betaalde) Details-call.
+            # De Details van deze pagina starten direct, terwijl het token van de volgende pagina nog niet geldig is.
+            nonlocal found
+            found += len(batch)
+            request_details([
+                result for result in batch
+                if not result.get("formatted_address") or matcher.matches(result["formatted_address"])
+            ])
+
+        with stage("places"):
+            google_places_search(query=query, stats=stats, budget=budget, on_page=on_page, wait=details_batch.wait_for)
+        stats["details_avoided"] += found - len(results)
+        if stats["details_avoided"]:
+            notify("caption", f"{stats['details_avoided']} van {found} resultaten liggen niet in {place_input}: zoveel Details-calls vermeden")
     else:  # Kaart + radius
-        if not clicked_location:
-            st.warning("Klik eerst op de kaart om een locatie te selecteren!")
-            return None, None, None
-
         lat, lon = clicked_location
-        step_m = min(radius_m // 3, 1000)
-        grid_points = generate_grid(lat, lon, radius_m, step_m=step_m)
-
-        results = []
-        for g_lat, g_lon in grid_points:
-            batch = google_places_search(query=category_input, location=(g_lat, g_lon), radius=radius_m)
-            for result in batch:
-                pid = result.get("place_id")
-                if pid and pid not in seen_place_ids:
-                    seen_place_ids.add(pid)
-                    results.append(result)
-
-        input_text = f"Kaart: {category_input} in {lat:.5f}, {lon:.5f} (radius {radius_m} m)"
-        filename = f"{category_input}_{f'{lat}_{lon}'}.xlsx".replace(" ", "_")
+        cells = plan_hex_grid(lat, lon, radius_m, plan.cell_radius_m if plan else min(radius_m, MAX_CELL_RADIUS_M))
+        progress(0.0, f"0/{len(cells)} gridpunten doorzocht")
+
+        def on_progress(done, total, latency):
+            progress(done / total, f"{done}/{total} gridpunten doorzocht (laatste: {latency:.1f} s)")
+
+        def on_results(batch):
+            # De pagina is al op radius gefilterd; hier alleen de afstanden voor de tussentijdse rijen.
+            # Zonder Details-limiet starten de Details van de pagina direct, terwijl het grid nog loopt;
+            # met een limiet moeten eerst alle resultaten binnen zijn om de dichtstbijzijnde te kiezen.
+            batch, batch_distances = filter_within_radius(batch, clicked_location, radius_m)
+            emit([(result["place_id"], build_row(result, {}, input_text, d)) for result, d in zip(batch, batch_distances)])
+            if max_details is None:
+                request_details(batch, batch_distances.tolist())
+                details_batch.poll()
+
+        with stage("places"):
+            grid_results, grid_stats = run_grid_search(
+                category_input, cells,
+                progress_callback=on_progress,
+                subdivide=hex_subdivider(lat, lon, radius_m, max_depth=plan.subdivide_depth if plan else MAX_SUBDIVIDE_DEPTH),
+                on_results=on_results,
+                cancel_event=cancel_event,
+                result_filter=lambda batch: filter_within_radius(batch, clicked_location, radius_m)[0],
+                budget=budget
+            )
+        progress(None)
+        searching = False
+        stats["places_calls"] += grid_stats["calls"]
+        stats.update(grid_stats["paging"])
+
+        for error in set(grid_stats["errors"]):
+            notify("warning", f"Fout bij API-call: {error}")
+        if grid_stats["latencies"]:
+            latencies = grid_stats["latencies"]
+            notify(
+                "caption",
+                f"{len(latencies)} gridpunten, {grid_stats['calls']} API-calls, "
+                f"latency per gridpunt gem. {np.mean(latencies):.1f} s / max {np.max(latencies):.1f} s"
+            )
 
-    if not results:
+        if max_details is not None and not cancelled():
+            # Alleen de dichtstbijzijnde krijgen Details, dus die vooraan
+            grid_results, grid_distances = filter_within_radius(grid_results, clicked_location, radius_m)
+            order = np.argsort(grid_distances, kind="stable")
+            request_details([grid_results[i] for i in order], grid_distances[order].tolist())
+        if len(results) > details_done:
+            progress(details_done / len(results), f"Place Details: {details_done}/{len(results)}")
+
+    summary = paging_summary(stats)
+    if summary:
+        notify("caption", summary)
+
+    with stage("details"):
+        details_list, details_errors = details_batch.finish()
+    progress(None)
+    emails_map, crawl_stats = {}, None
+    if crawl:
+        with stage("emails"):
+            emails_map, crawl_stats = crawl.finish()
+    if cancelled() or not results:
         return None, input_text, filename
+    for error in set(details_errors):
+        notify("warning", error)
 
-    if search_option == "Categorie typen en plaats selecteren op kaart":
-        center = clicked_location
-        results = [
-            result for result in results
-            if (loc := result.get("geometry", {}).get("location", {}))
-            and geodesic(center, (loc["lat"], loc["lng"])).meters <= radius_m
-        ]
-
-    for result in results:
-        place_id = result.get("place_id")
-        details = get_place_details(place_id) if place_id else {}
-
-        if search_option == "Categorie en plaats typen":
-            if not address_matches_place(details.get("formatted_address", ""), place_input):
-                continue
+    data_list = []
+    for i, (result, result_details, distance) in enumerate(zip(results, details_list, distances)):
+        if typed and has_details(i) and not matcher.matches(result_details.get("formatted_address", "")):
+            continue
+        data_list.append(build_row(result, result_details, input_text, distance))
 
-        loc = result.get("geometry", {}).get("location", {})
-        data_list.append({
-            "Input": input_text,
-            "Naam": details.get("name") or result.get("name") or None,
-            "Adres": details.get("formatted_address") or None,
-            "Latitude": loc.get("lat") or None,
-            "Longitude": loc.get("lng") or None,
-            "Telefoon": details.get("formatted_phone_number") or None,
-            "Website": details.get("website") or None,
-            "E-mail": None,  # placeholder
-            "Status": "Nieuw",  # default
-            "Datum": datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-        })
+    if stats["details_cached"] or stats["details_calls"]:
+        notify("caption", f"Place Details: {stats['details_cached']} uit cache, {stats['details_calls']} opgehaald via de API")
 
     df = pd.DataFrame(data_list)
-
-    # E-mails ophalen
-    if not df.empty and "Website" in df.columns:
-        websites = [w for w in df["Website"].dropna().unique()]
-        if websites:
-            emails_map = fetch_emails(websites)
-            df["E-mail"] = df["Website"].apply(
-                lambda w: emails_map.get(urlparse(w).netloc) if pd.notna(w) else None
-            )
-
-    # Resultaten opslaan for map markers
-    # st.session_state.last_results = df.to_dict(orient="records")
+    if "Afstand (m)" in df.columns:
+        # Dichtstbijzijnde eerst
+        df = df.sort_values("Afstand (m)", kind="stable").reset_index(drop=True)
+
+    if crawl_stats and crawl_stats["domains"]:
+        outcomes = crawl_stats["outcomes"]
+        slowest = sorted(crawl_stats["domains"].items(), key=lambda item: item[1]["seconds"], reverse=True)[:3]
+        notify(
+            "caption",
+            f"E-mail: {outcomes['found']} gevonden, {outcomes['none']} zonder adres, "
+            f"{outcomes['timeout'] + outcomes['deadline']} timeouts, {outcomes['error']} fouten "
+            f"({crawl_stats['cached']} van {len(crawl_stats['domains'])} websites uit de cache). "
+            f"Traagste websites: " + ", ".join(f"{domain} ({entry['seconds']:.1f} s)" for domain, entry in slowest)
+        )
+    if crawl and not df.empty and "Website" in df.columns:
+        df["E-mail"] = df["Website"].apply(
+            lambda w: emails_map.get(urlparse(w).netloc) if pd.notna(w) else None
+        )
 
     return df, input_text, filename
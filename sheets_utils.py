@@ -1,128 +1,489 @@
-from google.oauth2.service_account import Credentials
-import streamlit as st
-import gspread
+import json
+import re
+import threading
+import time
+import numpy as np
 import pandas as pd
+import unidecode
 from datetime import datetime
+from cache_utils import sheet_index
+from notify_utils import notify
+from config_utils import get_secret
+from metrics_utils import stage, record, enabled as metrics_enabled
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets",
           "https://www.googleapis.com/auth/drive"]
 
-creds = Credentials.from_service_account_info(st.secrets["gspread"], scopes=SCOPES)
-google_client = gspread.authorize(creds)
+# Pas bij de eerste upload aangemaakt en daarna door het hele proces gedeeld, zie get_google_client
+_google_client = None
+_spreadsheet = None
+_client_lock = threading.Lock()
+
+SHEET_KEY = "1tZNnGy-KBW0LdnmzqDbKGgkQ1I8wM7_rf5qnbAkTy0s"
+SYNC_MODE = "delta"  # "delta": alleen gewijzigde cellen en nieuwe rijen versturen; "full": hele sheet herschrijven
+SNAPSHOT_TTL = 300  # seconden dat de lokale kopie van de sheet gebruikt wordt (na een controle, zie snapshot_matches)
+PARTITION_BY = "category"  # "category": één worksheet per categorie; "category_place": per categorie + plaats (getypte zoekopdrachten)
+ARCHIVE_TITLE = "Archief"
+ARCHIVE_KEY = "__archief__"
+LEGACY_KEY = "__sheet1__"  # staat in de index zodra de historie van de oude sheet1 over de partities verdeeld is
+RETENTION_DAYS = 365  # rijen waarvan de Datum ouder is gaan naar de archief-worksheet
+ARCHIVE_INTERVAL = 24 * 3600  # seconden tussen twee archiveerrondes per partitie
+DATE_FORMAT = "%d-%m-%Y %H:%M:%S"
+
+# Lokale kopie per worksheet: worksheet.id -> (tijdstip, header, DataFrame)
+_snapshots = {}
+_sync_lock = threading.Lock()
+
+# Belangrijke kolommen voor vergelijking (alles behalve Status en Datum)
+COMPARE_COLS = ["Naam", "Adres", "Telefoon", "Website", "E-mail"]
+
+STATUS_VEROUDERD = "CHECKEN: verouderde gegevens?"
+STATUS_HUIDIG = "CHECKEN: huidige gegevens?"
+STATUS_NIET_ACTIEF = "Niet meer actief"
+
+def get_google_client():
+    """
+    Geautoriseerde gspread-client. gspread en de service-account-credentials worden pas bij het eerste gebruik
+    geladen, zodat importeren geen secrets of netwerk nodig heeft.
+    """
+    global _google_client
+    with _client_lock:
+        if _google_client is None:
+            import gspread
+            from google.oauth2.service_account import Credentials
+            creds = Credentials.from_service_account_info(get_secret("gspread", env_var="GOOGLE_SERVICE_ACCOUNT"), scopes=SCOPES)
+            _google_client = gspread.authorize(creds)
+        return _google_client
+
+def set_google_client(client):
+    """Een andere client injecteren, bijv. een lokale fake met open_by_key(...)"""
+    global _google_client, _spreadsheet
+    with _client_lock:
+        _google_client = client
+        _spreadsheet = None
+
+def get_spreadsheet():
+    """De spreadsheet (SHEET_KEY), één keer geopend en daarna gedeeld"""
+    global _spreadsheet
+    client = get_google_client()
+    with _client_lock:
+        if _spreadsheet is None:
+            _spreadsheet = client.open_by_key(SHEET_KEY)
+        return _spreadsheet
+
+def partition_key(category_input, input_text):
+    """
+    Partitie van een zoekcontext: de genormaliseerde categorie, bij PARTITION_BY "category_place"
+    voor getypte zoekopdrachten aangevuld met de plaats. Returnt (key, worksheet-titel).
+    """
+    category = " ".join(unidecode.unidecode(str(category_input or "")).lower().split())
+    key, title = category, str(category_input).strip().title()
+    prefix = f"getypt: {category_input} in ".lower()
+    if PARTITION_BY == "category_place" and input_text.lower().startswith(prefix):
+        place = input_text[len(prefix):].strip()
+        key += "|" + " ".join(unidecode.unidecode(place).lower().split())
+        title += f" - {place.title()}"
+    # Tekens die in een sheetnaam of A1-notatie problemen geven vervangen; maximaal 100 tekens
+    return key, re.sub(r"[\[\]:*?/\\']", " ", title)[:100] or "Zonder categorie"
+
+def get_partition_worksheet(key, title):
+    """
+    Worksheet van een partitie: via de gid in de lokale index, anders op titel, anders nieuw aangemaakt.
+    De gid wordt in de index bewaard.
+    """
+    from gspread.exceptions import WorksheetNotFound
+
+    spreadsheet = get_spreadsheet()
+    entry = sheet_index.get_partition(key)
+    worksheet = None
+    if entry:
+        try:
+            worksheet = spreadsheet.get_worksheet_by_id(entry[1])
+        except WorksheetNotFound:
+            worksheet = None
+    if worksheet is None:
+        try:
+            worksheet = spreadsheet.worksheet(title)
+        except WorksheetNotFound:
+            worksheet = spreadsheet.add_worksheet(title=title, rows=1000, cols=len(COMPARE_COLS) + 8)
+            record_sheet_call("add_worksheet")
+        sheet_index.set_partition(key, title, worksheet.id)
+    return worksheet
+
+def sheet_url(category_input=None, input_text=None):
+    """
+    Link naar de worksheet (en zo mogelijk het rijbereik) van een zoekcontext, alleen uit de lokale index.
+    Zonder (bekende) context de link naar de eerste worksheet.
+    """
+    url = f"https://docs.google.com/spreadsheets/d/{SHEET_KEY}/edit"
+    context = sheet_index.get_context(input_text) if input_text else None
+    if context:
+        _, _, gid, first, last, n_rows = context
+        # Alleen een bereik als de rijen van deze context aaneengesloten zijn
+        return f"{url}#gid={gid}" + (f"&range={first}:{last}" if last - first + 1 == n_rows else "")
+    entry = sheet_index.get_partition(partition_key(category_input, input_text or "")[0]) if category_input else None
+    return f"{url}#gid={entry[1] if entry else 0}"
 
 def normalise_for_compare(value):
     if pd.isna(value) or value in [None, "None", "", "nan", "NaN"]:
         return ""
     return str(value)
 
-def upload_to_google_sheets(df, category_input, input_text):
+def diff_results(df_existing_search, df_new, compare_cols=COMPARE_COLS, mark_removed=False):
+    """
+    Vergelijk nieuwe resultaten met de bestaande rijen van dezelfde zoekcontext.
+    Vergelijkingskolommen moeten al genormaliseerd zijn (zie normalise_for_compare).
+      - Exacte matches via een hash-index op de vergelijkingskolommen.
+      - Gedeeltelijke matches (2+ gelijke, niet-lege kolommen) via een inverted index per kolom;
+        bij meerdere kandidaten wint de eerste bestaande rij, net als voorheen.
+    Returnt een dict met:
+      - unchanged / changed / removed: index-labels van bestaande rijen
+      - exact_rows / changed_rows: boolean masks over df_new
     """
-    Update Google Sheets met nieuwe search results.
+    new_hash = pd.Series(pd.util.hash_pandas_object(df_new[compare_cols], index=False).values, index=df_new.index)
+    old_hash = pd.util.hash_pandas_object(df_existing_search[compare_cols], index=False).values
+
+    # Hash-index: eerste bestaande rij per unieke combinatie
+    first_by_hash = pd.Series(df_existing_search.index, index=old_hash)
+    first_by_hash = first_by_hash[~first_by_hash.index.duplicated()]
+    exact_match = new_hash.map(first_by_hash)
+    exact_rows = exact_match.notna()
+
+    # Inverted index per kolom: koppel elke nieuwe rij zonder exacte match aan bestaande rijen met dezelfde waarde
+    pending = df_new.index[~exact_rows.values]
+    pairs = []
+    for col in compare_cols:
+        old_vals = pd.DataFrame({"val": df_existing_search[col].str.strip().str.lower().values,
+                                 "pos": np.arange(len(df_existing_search))})
+        new_vals = pd.DataFrame({"val": df_new.loc[pending, col].str.strip().str.lower().values, "new": pending})
+        pairs.append(new_vals[new_vals["val"] != ""].merge(old_vals[old_vals["val"] != ""], on="val")[["new", "pos"]])
+    pairs = pd.concat(pairs, ignore_index=True)
+    counts = pairs.groupby(["new", "pos"]).size()
+    best = counts[counts >= 2].reset_index().groupby("new")["pos"].min()
+
+    removed = df_existing_search.index[:0]
+    if mark_removed:
+        removed = df_existing_search.index[~np.isin(old_hash, new_hash.values)]
+
+    return {
+        "unchanged": pd.Index(exact_match[exact_rows].astype(df_existing_search.index.dtype).unique()),
+        "changed": df_existing_search.index[best.values],
+        "removed": removed,
+        "exact_rows": exact_rows,
+        "changed_rows": pd.Series(df_new.index.isin(best.index), index=df_new.index),
+    }
+
+def record_sheet_call(operation, payload=None):
+    """Sheets API-call meetellen; de grootte wordt alleen (als JSON) geschat als er gemeten wordt"""
+    if metrics_enabled():
+        record(calls=1, bytes=0 if payload is None else len(json.dumps(payload, default=str)), status=operation)
+
+def snapshot_matches(worksheet, header, snapshot):
+    """
+    Goedkope controle (één col_values) of de snapshot nog klopt met de sheet: de kolom Naam (of anders de eerste)
+    moet rij voor rij gelijk zijn. Zo vallen rijen die intussen door een ander proces of een gebruiker toegevoegd,
+    verwijderd of gesorteerd zijn op, en komen delta-updates niet in de cellen van andere bedrijven terecht.
+    """
+    col = header.index("Naam") if "Naam" in header else 0
+    column = worksheet.col_values(col + 1)
+    record_sheet_call("col_values", column)
+    expected = [str(header[col])] + [normalise_for_compare(value) for value in snapshot.iloc[:, col]]
+    while expected and expected[-1] == "":
+        expected.pop()  # col_values laat lege cellen onderaan weg
+    return [str(value) for value in column] == expected
+
+def load_sheet(worksheet, max_age=SNAPSHOT_TTL):
+    """
+    Bestaande data van de worksheet ophalen; uit de lokale snapshot als die jonger is dan max_age
+    en de sheet sindsdien niet door iemand anders veranderd is (zie snapshot_matches).
+    Returnt (header, DataFrame).
+    """
+    cached = _snapshots.get(worksheet.id)
+    if cached and time.time() - cached[0] < max_age and cached[1] and snapshot_matches(worksheet, cached[1], cached[2]):
+        record(status="snapshot")
+        return list(cached[1]), cached[2].copy()
+
+    existing_records = worksheet.get_all_records()
+    record_sheet_call("get_all_records", existing_records)
+    if existing_records:
+        df_existing = pd.DataFrame(existing_records)
+        return df_existing.columns.tolist(), df_existing
+    header = worksheet.row_values(1)
+    record_sheet_call("row_values", header)
+    return header, pd.DataFrame(columns=header)
+
+def write_sheet(worksheet, header, updated_sheet, touched, n_existing, mode=SYNC_MODE):
+    """
+    Schrijf de bijgewerkte sheet terug.
+      - "delta": gewijzigde cellen (touched: rij-label -> kolommen) in één batch_update,
+        nieuwe rijen (vanaf n_existing) in één append_rows.
+      - "full" (of als de kolommen veranderd zijn): sheet leegmaken en volledig herschrijven.
+    Daarna wordt de lokale snapshot bijgewerkt.
+    """
+    from gspread.utils import rowcol_to_a1
+
+    columns = updated_sheet.columns.tolist()
+    # NaN is geen geldige JSON (gspread verstuurt met allow_nan=False), bijv. "Afstand (m)" bij getypte rijen
+    values = updated_sheet.astype(object).where(updated_sheet.notna(), "")
+    if mode == "full" or columns != header:
+        rows = [columns] + values.values.tolist()
+        worksheet.clear()
+        record_sheet_call("clear")
+        worksheet.update(rows)
+        record_sheet_call("update", rows)
+    else:
+        # Rijen vanaf n_existing gaan in hun geheel mee met append_rows
+        positions = {label: updated_sheet.index.get_loc(label) for label in touched}
+        cells = [
+            {
+                "range": rowcol_to_a1(positions[label] + 2, columns.index(col) + 1),  # rij 1 is de header
+                "values": [[values.at[label, col]]]
+            }
+            for label, cols in touched.items() if positions[label] < n_existing for col in sorted(cols)
+        ]
+        if cells:
+            worksheet.batch_update(cells)
+            record_sheet_call("batch_update", cells)
+        new_rows = values.iloc[n_existing:].values.tolist()
+        if new_rows:
+            worksheet.append_rows(new_rows)
+            record_sheet_call("append_rows", new_rows)
+    _snapshots[worksheet.id] = (time.time(), columns, updated_sheet)
+
+def context_ranges(sheet):
+    """Per zoekcontext (Input) de eerste en laatste sheetrij en het aantal rijen; rij 1 is de header"""
+    if sheet.empty or "Input" not in sheet.columns:
+        return {}
+    rows = pd.DataFrame({"input": sheet["Input"].fillna("").astype(str).values, "row": np.arange(len(sheet)) + 2})
+    grouped = rows[rows["input"] != ""].groupby("input")["row"].agg(["min", "max", "count"])
+    return {input_text: (int(first), int(last), int(n)) for input_text, (first, last, n) in grouped.iterrows()}
+
+def split_expired(sheet, retention_days=RETENTION_DAYS):
+    """Splits in (te bewaren, te archiveren): rijen met een Datum ouder dan retention_days gaan naar het archief"""
+    if sheet.empty or "Datum" not in sheet.columns:
+        return sheet, sheet.iloc[:0]
+    dates = pd.to_datetime(sheet["Datum"], format=DATE_FORMAT, errors="coerce")
+    expired = (dates < pd.Timestamp.now() - pd.Timedelta(days=retention_days)).values
+    return sheet[~expired].reset_index(drop=True), sheet[expired]
+
+def archive_rows(rows):
+    """
+    Rijen achteraan de archief-worksheet toevoegen, in de kolomvolgorde van het archief (één append_rows).
+    Rijen die al in het archief staan (zelfde row_keys) worden overgeslagen, zodat een herhaalde poging
+    na een mislukte partitie-write geen dubbele archiefrijen geeft. Returnt het aantal toegevoegde rijen.
+    """
+    archive = get_partition_worksheet(ARCHIVE_KEY, ARCHIVE_TITLE)
+    header, archived = load_sheet(archive, max_age=0)
+    if not archived.empty:
+        rows = rows[~np.isin(row_keys(rows), row_keys(archived))]
+    if rows.empty:
+        return 0
+    columns = header + [c for c in rows.columns if c not in header]
+    values = rows.reindex(columns=columns).astype(object)
+    values = values.where(values.notna(), "").values.tolist()
+    if columns != header:
+        if header:
+            # Nieuwe kolommen: de header aanvullen
+            from gspread.utils import rowcol_to_a1
+            archive.update([columns], rowcol_to_a1(1, 1))
+            record_sheet_call("update", [columns])
+        else:
+            values = [columns] + values
+    archive.append_rows(values)
+    record_sheet_call("append_rows", values)
+    return len(rows)
+
+def merge_search(updated_sheet, touched, df, category_input, input_text):
+    """
+    Verwerk de resultaten van één zoekopdracht in updated_sheet.
       - Vergelijk nieuwe met oude entries voor dezelfde zoekcontext + categorie (+ plaats).
       - Detecteert nieuwe, gewijzigde, ongewijzigde (en verdwenen) bedrijven.
-      - Past automatisch de Status en Datum aan.
-    Returnt altijd de resultaten van de huidige search voor Streamlit + Excel-download.
+      - Past automatisch de Status en Datum aan; gewijzigde cellen komen in touched (rij-label -> kolommen).
+    Returnt (bijgewerkte sheet, resultaten voor display/download).
     """
-    try:
-        # Verbinding maken met Google Sheets
-        sheet = google_client.open_by_key("1tZNnGy-KBW0LdnmzqDbKGgkQ1I8wM7_rf5qnbAkTy0s")
-        worksheet = sheet.sheet1
+    compare_cols = COMPARE_COLS
+
+    # Zorg dat alle belangrijke kolommen bestaan in beide dataframes
+    for col in compare_cols + ["Input", "Latitude", "Longitude", "Status", "Datum"]:
+        if col not in updated_sheet.columns:
+            updated_sheet[col] = None
+        if col not in df.columns:
+            df[col] = None
+
+    # Filter bestaande data op dezelfde zoekcontext en bepaal de nuttige kolommen voor display/download
+    if input_text.startswith("Getypt:"):
+        mask = updated_sheet["Input"].fillna("").str.lower() == input_text.lower()
+        display_cols = ["Naam", "Adres", "Telefoon", "Website", "E-mail"]
+    else: # Kaart search: filter op categorie alleen
+        # Haal categorie uit input (bijv. "Kaart: Restaurant in 52.0, 5.0 (radius 1000 m)")
+        mask = updated_sheet["Input"].fillna("").str.lower().str.startswith(f"kaart: {category_input.lower()}")
+        display_cols = ["Naam", "Adres", "Afstand (m)", "Latitude", "Longitude", "Telefoon", "Website", "E-mail"]
 
+    df_existing_search = updated_sheet[mask].copy()
+
+    # Als er geen eerdere resultaten zijn voor deze input, voeg alles nieuw toe
+    if df_existing_search.empty:
+        new_rows = df
+    else:
+        # Zorg dat vergelijkingskolommen altijd strings zijn, en normaliseer lege waarden
+        df_existing_search[compare_cols] = df_existing_search[compare_cols].map(normalise_for_compare)
+        df[compare_cols] = df[compare_cols].map(normalise_for_compare)
+
+        diff = diff_results(df_existing_search, df, compare_cols, mark_removed=input_text.startswith("Getypt:"))
+        now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+
+        # Exact dezelfde rij bestaat al: bestaande (oude) entry krijgt datumupdate
+        updated_sheet.loc[diff["unchanged"], "Datum"] = now
+        # Gedeeltelijke overeenkomst: bestaande (oude) entry krijgt statuswijziging en datumupdate
+        updated_sheet.loc[diff["changed"], "Status"] = STATUS_VEROUDERD
+        updated_sheet.loc[diff["changed"], "Datum"] = now
+        # Oude resultaten die niet meer voorkomen in de nieuwe search (alleen bij getypte searches)
+        updated_sheet.loc[diff["removed"], "Status"] = STATUS_NIET_ACTIEF
+        updated_sheet.loc[diff["removed"], "Datum"] = now
+
+        for label in diff["unchanged"]:
+            touched.setdefault(label, set()).add("Datum")
+        for label in diff["changed"].append(diff["removed"]):
+            touched.setdefault(label, set()).update(["Status", "Datum"])
+
+        # Nieuwe en geüpdate entries in één keer toevoegen; volledig nieuwe entries staan al op "Nieuw"
+        new_rows = df[~diff["exact_rows"]].copy()
+        new_rows.loc[diff["changed_rows"][~diff["exact_rows"]], "Status"] = STATUS_HUIDIG
+
+    updated_sheet = pd.concat([updated_sheet, new_rows], ignore_index=True)
+    return updated_sheet, df[[c for c in display_cols if c in df.columns]]
+
+def sync_worksheet(worksheet, searches, mode=None, partition=None):
+    """
+    Verwerk zoekopdrachten (lijst van (df, category_input, input_text)) in één worksheet: één keer lezen, één keer schrijven.
+    Met partition (een key uit partition_key) worden daarna verlopen rijen gearchiveerd (hooguit eens per
+    ARCHIVE_INTERVAL) en de rijbereiken per zoekcontext in de lokale index bijgewerkt.
+    Returnt per zoekopdracht de resultaten voor display/download.
+    """
+    with _sync_lock:
         # Bestaande data ophalen
-        existing_records = worksheet.get_all_records()
-        df_existing = pd.DataFrame(existing_records) if existing_records else pd.DataFrame(columns=df.columns)
-
-        # Belangrijke kolommen voor vergelijking (alles behalve Status en Datum)
-        compare_cols = ["Naam", "Adres", "Telefoon", "Website", "E-mail"]
-
-        # Zorg dat alle belangrijke kolommen bestaan in beide dataframes
-        for col in compare_cols + ["Input", "Latitude", "Longitude", "Status", "Datum"]:
-            if col not in df_existing.columns:
-                df_existing[col] = None
-            if col not in df.columns:
-                df[col] = None
-
-        # Filter bestaande data op dezelfde zoekcontext en bepaal de nuttige kolommen voor display/download
-        if input_text.startswith("Getypt:"):
-            mask = df_existing["Input"].fillna("").str.lower() == input_text.lower()
-            display_cols = ["Naam", "Adres", "Telefoon", "Website", "E-mail"]
-        else: # Kaart search: filter op categorie alleen
-            # Haal categorie uit input (bijv. "Kaart: Restaurant in 52.0, 5.0 (radius 1000 m)")
-            mask = df_existing["Input"].fillna("").str.lower().str.startswith(f"kaart: {category_input.lower()}")
-            display_cols = ["Naam", "Adres", "Latitude", "Longitude", "Telefoon", "Website", "E-mail"]
-
-        df_existing_search = df_existing[mask].copy()
+        header, df_existing = load_sheet(worksheet)
+        if df_existing.empty and not header:
+            df_existing = pd.DataFrame(columns=searches[0][0].columns if searches else [])
+
         updated_sheet = df_existing.copy()
+        touched = {}  # rij-label -> gewijzigde kolommen
+        results = []
+        for df, category_input, input_text in searches:
+            updated_sheet, result = merge_search(updated_sheet, touched, df, category_input, input_text)
+            results.append(result)
 
-        # Als er geen eerdere resultaten zijn voor deze input, voeg alles nieuw toe
-        if df_existing_search.empty:
-            updated_sheet = pd.concat([updated_sheet, df], ignore_index=True)
-            worksheet.clear()
-            worksheet.update([updated_sheet.columns.tolist()] + updated_sheet.values.tolist())
-            return df[[c for c in display_cols if c in df.columns]]
+        # Verlopen rijen naar het archief; de overgebleven rijen verschuiven, dus dan de hele worksheet herschrijven
+        expired = None
+        entry = sheet_index.get_partition(partition) if partition else None
+        if entry and time.time() - (entry[2] or 0) > ARCHIVE_INTERVAL:
+            updated_sheet, expired = split_expired(updated_sheet)
+            if not expired.empty:
+                mode = "full"
 
-        # Zorg dat vergelijkingskolommen altijd strings zijn, en normaliseer lege waarden
-        df_existing_search[compare_cols] = df_existing_search[compare_cols].applymap(normalise_for_compare)
-        df[compare_cols] = df[compare_cols].applymap(normalise_for_compare)
-
-        # Maak hulplijsten voor vergelijking
-        existing_tuples = df_existing_search[compare_cols].apply(tuple, axis=1).tolist()
-        new_tuples = df[compare_cols].apply(tuple, axis=1).tolist()
-
-        # Counters voor diff
-        nieuw_count = gewijzigd_count = ongewijzigd_count = verwijderd_count = 0
-
-        # Loop door nieuwe resultaten
-        for i, new_row in df.iterrows():
-            new_tuple = tuple(new_row[col] for col in compare_cols)
-
-            if new_tuple in existing_tuples:
-                # Exact dezelfde rij bestaat al dus bestaande (oude) entry krijg datumupdate
-                ongewijzigd_count += 1
-                idx = df_existing_search.index[existing_tuples.index(new_tuple)]
-                global_idx = updated_sheet.index.get_loc(idx)
-                updated_sheet.loc[global_idx, "Datum"] = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-                continue
-
-            # Check op gedeeltelijke match (2+ overeenkomende kolommen)
-            match_found = False
-            for j, old_row in df_existing_search.iterrows():
-                matches = sum(
-                    1 for col in compare_cols
-                    if pd.notna(new_row[col]) and str(new_row[col]).strip().lower() == str(old_row[col]).strip().lower()
+        # Eerst archiveren en dan pas de partitie zonder de verlopen rijen herschrijven: mislukt het archiveren,
+        # dan blijven ze in de partitie staan. archive_rows slaat al gearchiveerde rijen over, dus opnieuw proberen is veilig.
+        if expired is not None and not expired.empty:
+            archive_rows(expired)
+        # Upload terug naar Google Sheets
+        write_sheet(worksheet, header, updated_sheet, touched, len(df_existing), mode or SYNC_MODE)
+        if expired is not None:
+            sheet_index.mark_archived(partition)
+        if partition:
+            sheet_index.set_contexts(partition, context_ranges(updated_sheet))
+    return results
+
+def upload_batch_to_google_sheets(searches, worksheet=None, mode=None, raise_errors=False):
+    """
+    Verwerk meerdere zoekopdrachten (lijst van (df, category_input, input_text)).
+    Standaard gaat elke zoekopdracht naar de worksheet van zijn partitie (zie partition_key), met per partitie
+    één keer lezen en één keer schrijven; met worksheet (bijv. een fake) gaat alles naar die ene worksheet.
+    Returnt per zoekopdracht de resultaten voor display/download; bij een fout de oorspronkelijke df's,
+    of de fout zelf als raise_errors aan staat.
+    """
+    with stage("sheets"):
+        try:
+            if worksheet is not None:
+                return sync_worksheet(worksheet, searches, mode)
+
+            ensure_legacy_migrated()
+
+            # Zoekopdrachten per partitie groeperen, in volgorde van binnenkomst
+            partitions = {}
+            for i, (_, category_input, input_text) in enumerate(searches):
+                key, title = partition_key(category_input, input_text)
+                partitions.setdefault((key, title), []).append(i)
+
+            results = [None] * len(searches)
+            for (key, title), indices in partitions.items():
+                partition_results = sync_worksheet(
+                    get_partition_worksheet(key, title), [searches[i] for i in indices], mode, partition=key
                 )
-                if matches >= 2: # Gedeeltelijke overeenkomst dus bestaande (oude) entry krijgt statuswijziging en datumupdate
-                    match_found = True
-                    global_idx = updated_sheet.index.get_loc(j)
-                    updated_sheet.loc[global_idx, "Status"] = "CHECKEN: verouderde gegevens?"
-                    updated_sheet.loc[global_idx, "Datum"] = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-                    break
-
-            if match_found:
-                gewijzigd_count += 1
-                # Nieuwe geüpdate entry toevoegen
-                new_row["Status"] = "CHECKEN: huidige gegevens?"
-                updated_sheet = pd.concat([updated_sheet, pd.DataFrame([new_row])], ignore_index=True)
+                for i, result in zip(indices, partition_results):
+                    results[i] = result
+            return results
+
+        except Exception as e:
+            # Bij een mislukte write klopt de snapshot misschien niet meer met de sheet
+            if worksheet is not None:
+                _snapshots.pop(worksheet.id, None)
             else:
-                nieuw_count += 1
-                # Volledig nieuwe entry toevoegen; status staat al op "Nieuw"
-                updated_sheet = pd.concat([updated_sheet, pd.DataFrame([new_row])], ignore_index=True)
+                _snapshots.clear()
+            record(errors=1, status="error")
+            if raise_errors:
+                raise
+            notify("error", f"Fout bij uploaden naar Google Sheets: {e}")
+            return [df for df, _, _ in searches] # Fallback zodat iets terugkomt
 
-        # Oude resultaten die niet meer voorkomen in de nieuwe search (alleen bij getypte searches)
-        if input_text.startswith("Getypt:"):
-            for j, old_row in df_existing_search.iterrows():
-                old_tuple = tuple(old_row[col] for col in compare_cols)
-                if old_tuple not in new_tuples:
-                    verwijderd_count += 1
-                    global_idx = updated_sheet.index.get_loc(j)
-                    updated_sheet.loc[global_idx, "Status"] = "Niet meer actief"
-                    updated_sheet.loc[global_idx, "Datum"] = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+def row_keys(df):
+    """Hash per rij van de zoekcontext (Input) en de vergelijkingskolommen, genormaliseerd; om dubbele rijen te herkennen"""
+    norm = df.reindex(columns=["Input"] + COMPARE_COLS).map(normalise_for_compare)
+    norm["Input"] = norm["Input"].str.lower()
+    return pd.util.hash_pandas_object(norm, index=False).values
 
-        # Upload terug naar Google Sheets
-        worksheet.clear()
-        worksheet.update([updated_sheet.columns.tolist()] + updated_sheet.values.tolist())
-        return df[[c for c in display_cols if c in df.columns]]
+def migrate_legacy_sheet():
+    """
+    De historie uit de oude sheet1 over de partities verdelen (sheet1 zelf blijft ongewijzigd staan).
+    De categorie komt uit de Input-kolom ("Getypt: <categorie> in ..." of "Kaart: <categorie> in ...").
+    Rijen die al in hun partitie staan (zelfde Input en vergelijkingskolommen) worden overgeslagen,
+    dus nog een keer draaien is veilig. Daarna staat LEGACY_KEY in de index. Returnt het aantal gemigreerde rijen.
+    """
+    sheet1 = get_spreadsheet().sheet1
+    with _sync_lock:
+        header, legacy = load_sheet(sheet1, max_age=0)
+    migrated = 0
+    if not legacy.empty and "Input" in legacy.columns:
+        inputs = legacy["Input"].fillna("").astype(str)
+        categories = inputs.str.extract(r"^(?:Getypt|Kaart): (.*?) in ", flags=re.IGNORECASE)[0].fillna("")
+        partitions = pd.DataFrame(
+            [partition_key(category, input_text) for category, input_text in zip(categories, inputs)],
+            columns=["key", "title"], index=legacy.index
+        )
+        for (key, title), labels in partitions.groupby(["key", "title"]).groups.items():
+            worksheet = get_partition_worksheet(key, title)
+            with _sync_lock:
+                existing_header, existing = load_sheet(worksheet, max_age=0)
+                rows = legacy.loc[labels]
+                rows = rows[~np.isin(row_keys(rows), row_keys(existing))] if not existing.empty else rows
+                if rows.empty:
+                    continue
+                merged = pd.concat([existing, rows], ignore_index=True)
+                write_sheet(worksheet, existing_header, merged, {}, len(existing), "full")
+                sheet_index.set_contexts(key, context_ranges(merged))
+            migrated += len(rows)
+    sheet_index.set_partition(LEGACY_KEY, sheet1.title, sheet1.id)
+    return migrated
 
-    except Exception as e:
-        st.error(f"Fout bij uploaden naar Google Sheets: {e}")
-        return df # Fallback zodat iets terugkomt
\ No newline at end of file
+def ensure_legacy_migrated():
+    """Bij de eerste sync naar de partities eenmalig de historie van sheet1 overnemen (zie migrate_legacy_sheet)"""
+    if sheet_index.get_partition(LEGACY_KEY) is None:
+        migrated = migrate_legacy_sheet()
+        notify("info", f"{migrated} rijen uit de oude sheet naar de worksheets per categorie overgezet.")
+
+def upload_to_google_sheets(df, category_input, input_text, worksheet=None, mode=None):
+    """
+    Update Google Sheets met nieuwe search results (zie merge_search).
+    Verstuurt standaard alleen de wijzigingen (zie SYNC_MODE); een andere worksheet (bijv. een fake) kan meegegeven worden.
+    Returnt altijd de resultaten van de huidige search voor Streamlit + Excel-download.
+    """
+    return upload_batch_to_google_sheets([(df, category_input, input_text)], worksheet, mode)[0]
@@ -1,4 +1,8 @@
+import pandas as pd
 import streamlit as st
+from metrics_utils import to_json, to_prometheus
+from cache_utils import usage_store
+from budget_utils import USER_DAILY_BUDGET_USD, DAILY_BUDGET_USD
 
 def render_ui():
     search_option = st.radio(
@@ -16,4 +20,38 @@ def render_ui():
         st.write("Dubbelklik op de kaart om het centrum van je zoekgebied te selecteren.")
         radius_m = st.slider("Straal (meters)", 100, 5000, 1000)
 
-    return search_option, category_input, place_input, radius_m
+    force_refresh = st.checkbox("Opnieuw zoeken (resultaten uit de cache negeren)", value=False)
+    collect_metrics = st.checkbox("Metingen bijhouden (tijd, calls en kosten per stap)", value=True)
+
+    return search_option, category_input, place_input, radius_m, force_refresh, collect_metrics
+
+def render_budget(user):
+    """Verbruik van de Places API vandaag, t.o.v. het gebruikers- en dagbudget (gedeeld door alle sessies)"""
+    total, own = usage_store.spent(user)
+    st.caption(
+        f"Places API vandaag: ${own:.2f} van ${USER_DAILY_BUDGET_USD:.2f} ({user}), "
+        f"${total:.2f} van ${DAILY_BUDGET_USD:.2f} in totaal"
+    )
+
+def render_metrics(snapshot):
+    """Inklapbaar paneel met de metingen per stap van de laatste zoekopdracht, plus export als JSON of Prometheus-tekst"""
+    total = snapshot["total"]
+    with st.expander(f"Metingen: {total['seconds']:.1f} s, {total['calls']} calls, ca. ${total['cost_usd']:.2f} API-kosten"):
+        rows = [
+            {
+                "Stap": name,
+                "Tijd (s)": round(values["seconds"], 2),
+                "Calls": values["calls"],
+                "KB": round(values["bytes"] / 1024, 1),
+                "Fouten": values["errors"],
+                "Kosten ($)": round(values["cost_usd"], 3),
+                "Statussen": ", ".join(f"{status}: {count}" for status, count in sorted(values["statuses"].items())),
+            }
+            for name, values in snapshot["stages"].items()
+        ]
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+        json_col, prometheus_col = st.columns(2)
+        with json_col:
+            st.download_button("Download JSON", to_json(snapshot), file_name="metingen.json", mime="application/json", key="metrics_json")
+        with prometheus_col:
+            st.download_button("Download Prometheus", to_prometheus(snapshot), file_name="metingen.prom", mime="text/plain", key="metrics_prometheus")